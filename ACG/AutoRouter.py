@@ -3,6 +3,42 @@ from .Rectangle import Rectangle
 from .XY import XY
 from .tech import tech_info
 from typing import Tuple, Union, Optional, List, Dict
+import numpy as np
+
+# Sentinel distinguishing a missing route_point_dict entry from a stored None width
+_MISSING = object()
+
+
+def _quantize_pt(point) -> Tuple[int, int]:
+    """
+    Quantizes an (x, y) point onto the 1nm grid as an integer tuple for use as a
+    route_point_dict key. Integer tuples hash faster than rounded float tuples and
+    collapse the floating point noise that made equal points miss the dict
+    """
+    return int(round(point[0] * 1000)), int(round(point[1] * 1000))
+
+# Direction codes used by _compute_dirs: 0 = '+x', 1 = '-x', 2 = '+y', 3 = '-y'
+DIR_NAMES = ('+x', '-x', '+y', '-y')
+
+# Offset of shield_1 from center for each (previous direction, current direction)
+# pair, indexed by prev_code * 4 + cur_code. A flat tuple lookup replaces the two
+# string-keyed dict lookups per point of the old nested shield_dict
+SHIELD_OFFSETS = (
+    (0, 1), (0, 1), (-1, 1), (1, 1),  # from '+x'
+    (0, -1), (0, -1), (-1, -1), (1, -1),  # from '-x'
+    (-1, 1), (-1, -1), (-1, 0), (-1, 0),  # from '+y'
+    (1, 1), (1, -1), (1, 0), (1, 0),  # from '-y'
+)
+
+# Offset normal of a route endpoint keyed by the segment's displacement signs
+# (dx, dy); dy is only consulted when the segment does not move in x
+NORMAL_LOOKUP = {
+    (1, 0): (0, -1),
+    (-1, 0): (0, 1),
+    (0, 1): (1, 0),
+    (0, -1): (-1, 0),
+    (0, 0): (-1, 0),
+}
 
 
 class EZRouter:
@@ -57,34 +93,6 @@ class EZRouter:
         self.route_points = []
         self.route_point_dict = {}
 
-        # to determine offset of shield_1 from center
-        self.shield_dict = {
-            '+x': {
-                '+x': (0, 1),
-                '-x': (0, 1),
-                '+y': (-1, 1),
-                '-y': (1, 1)
-            },
-            '-x': {
-                '+x': (0, -1),
-                '-x': (0, -1),
-                '+y': (-1, -1),
-                '-y': (1, -1)
-            },
-            '+y': {
-                '+x': (-1, 1),
-                '-x': (-1, -1),
-                '+y': (-1, 0),
-                '-y': (-1, 0)
-            },
-            '-y': {
-                '+x': (1, 1),
-                '-x': (1, -1),
-                '+y': (1, 0),
-                '-y': (1, 0)
-            }
-        }
-
         # If the user provided information for a new route, create one
         if start_rect and start_direction:
             self.new_route(start_rect=start_rect,
@@ -145,8 +153,7 @@ class EZRouter:
         elif start_direction[1] == 'y':
             width = start_rect.ur.x - start_rect.ll.x
 
-        current_point = tuple(self.current_rect[self.current_handle].xy)
-        self.route_point_dict[current_point] = width
+        self.route_point_dict[_quantize_pt(self.current_rect[self.current_handle].xy)] = width
 
         # Reset location dict
         self.loc = dict(
@@ -205,7 +212,7 @@ class EZRouter:
             else:
                 self.current_rect.set_dim('y', length)
         self.current_rect.align(self.current_handle, offset=start_loc)
-        self.route_point_dict[(round(start_loc[0], 3), round(start_loc[1], 3))] = width
+        self.route_point_dict[_quantize_pt(start_loc)] = width
         return self
 
     def draw_straight_route(self,
@@ -410,6 +417,7 @@ class EZRouter:
             self.gen.connect_wires(new_rect, new_rect_2)
 
         # Update the pointers for the current rect, handle, and direction
+        new_rect.kind = 'via'
         self.loc['rect_list'].append(new_rect)
         self.current_rect = new_rect
         self.current_dir = direction
@@ -522,7 +530,54 @@ class EZRouter:
             p = (round(point[0], 3), round(point[1], 3))
             self.route_points.append((p, layer))
             if add_width:
-                self.route_point_dict[p] = width
+                self.route_point_dict[_quantize_pt(p)] = width
+
+    @staticmethod
+    def _compute_dirs(manh) -> List[int]:
+        """
+        Computes the cardinal direction of each segment in a manhattanized point list
+        as small int codes (see DIR_NAMES). One vectorized diff over the stacked
+        coordinates replaces a Python comparison chain per point, which adds up on
+        long bus routes, and the int codes index SHIELD_OFFSETS directly
+        """
+        pts = np.array([(p[0][0], p[0][1]) for p in manh], dtype=np.float64)
+        d = np.diff(pts, axis=0)
+        dirs_idx = np.where(d[:, 0] != 0,
+                            np.where(d[:, 0] > 0, 0, 1),
+                            np.where(d[:, 1] < 0, 3, 2))
+        return dirs_idx.tolist()
+
+    def add_route_points_bulk(self, entries: List[tuple]):
+        """
+        Adds a batch of points to the route network in one pass.
+
+        Notes
+        -----
+        * Equivalent to calling add_route_points once per point with add_width=True,
+        without paying the call overhead per point
+
+        Parameters
+        ----------
+        entries : List[tuple]
+            A list of (point, layer, width) entries where point is Tuple[float, float] or XY
+        """
+        append = self.route_points.append
+        rpd = self.route_point_dict
+        for point, layer, width in entries:
+            p = (round(point[0], 3), round(point[1], 3))
+            append((p, layer))
+            rpd[_quantize_pt(p)] = width
+
+    @staticmethod
+    def _derive_normal(pt0, pt1) -> Tuple[int, int]:
+        """
+        Determines the offset direction of a route relative to the segment from pt0 to
+        pt1 via one NORMAL_LOOKUP access. Shared by the start/end cascades of the shield,
+        diff pair, and bus routers, which previously each inlined the comparison chain
+        """
+        dx = (pt0[0] > pt1[0]) - (pt0[0] < pt1[0])
+        dy = 0 if dx else (pt0[1] > pt1[1]) - (pt0[1] < pt1[1])
+        return NORMAL_LOOKUP[(dx, dy)]
 
     def cardinal_helper(self, router_temp, manh, start_pt, start_dir, start_layer, offset, dirs=None, start=None):
         """
@@ -530,69 +585,49 @@ class EZRouter:
         """
         if not dirs:
             # Calculate sequence of routing directions
-            dirs = []
-
-            for i in range(len(manh) - 1):
-                pt0 = manh[i]
-                pt1 = manh[i + 1]
-
-                if pt0[0][0] > pt1[0][0]:
-                    dirs.append('-x')
-                elif pt0[0][0] < pt1[0][0]:
-                    dirs.append('+x')
-                elif pt0[0][1] > pt1[0][1]:
-                    dirs.append('-y')
-                else:
-                    dirs.append('+y')
+            dirs = self._compute_dirs(manh)
 
         # Determine initial offset direction of routes from center
         if not start:
-            if start_pt[0] > manh[1][0][0]:
-                start = (0, -1)
-            elif start_pt[0] < manh[1][0][0]:
-                start = (0, 1)
-            elif start_pt[1] > manh[1][0][1]:
-                start = (1, 0)
-            else:
-                start = (-1, 0)
-
-        for i in range(len(dirs)):
-            if i == 0:
-                # Determine start point of new route relative to given route
-                shield_start = ((start_pt[0] + offset * start[0],
-                                 start_pt[1] + offset * start[1]), start_layer)
-
-                # Initialize new router
-                router = EZRouter(self.gen)
-                router.new_route_from_location(shield_start[0], start_dir, start_layer, 0.5)
-            else:
-                pt0 = manh[i]
-                # Get offset direction given previous routing direction and current routing direction
-                direc = self.shield_dict[dirs[i - 1]][dirs[i]]
-
-                # Determine new point in route based on offset and add to router
-                point = (pt0[0][0] + offset * direc[0],
-                         pt0[0][1] + offset * direc[1])
-                router.add_route_points([point], pt0[1], width=router_temp.route_point_dict[pt0[0]])
+            start = self._derive_normal(start_pt, manh[1][0])
+
+        # Determine start point of new route relative to given route
+        shield_start = ((start_pt[0] + offset * start[0],
+                         start_pt[1] + offset * start[1]), start_layer)
+
+        # Initialize new router
+        router = EZRouter(self.gen)
+        router.new_route_from_location(shield_start[0], start_dir, start_layer, 0.5)
+
+        # Collect the offset route points and insert them in one bulk call instead of
+        # entering add_route_points once per point. Since the input list is already
+        # manhattanized and each point just shifts along its offset direction, the
+        # offset route's manhattanized list is assembled directly in the same pass
+        # instead of re-running manhattanize_point_list per offset route
+        rpd_temp = router_temp.route_point_dict
+        entries = []
+        manh_offset = [(shield_start[0], start_layer)]
+        for i in range(1, len(dirs)):
+            pt0 = manh[i]
+            # Get offset direction given previous routing direction and current routing direction
+            direc = SHIELD_OFFSETS[dirs[i - 1] * 4 + dirs[i]]
+
+            # Determine new point in route based on offset
+            pt = (round(pt0[0][0] + offset * direc[0], 3),
+                  round(pt0[0][1] + offset * direc[1], 3))
+            entries.append((pt, pt0[1], rpd_temp[_quantize_pt(pt0[0])]))
+            manh_offset.append((pt, pt0[1]))
 
         # Determine final offset direction of routes from center and add final point to router
-        if manh[-2][0][0] > manh[-1][0][0]:
-            end = (0, -1)
-        elif manh[-2][0][0] < manh[-1][0][0]:
-            end = (0, 1)
-        elif manh[-2][0][1] > manh[-1][0][1]:
-            end = (1, 0)
-        else:
-            end = (-1, 0)
-
-        router.add_route_points(
-            [(manh[-1][0][0] + offset * end[0],
-              manh[-1][0][1] + offset * end[1])], manh[-1][1],
-            width=router_temp.route_point_dict[manh[-1][0]])
+        end = self._derive_normal(manh[-2][0], manh[-1][0])
 
-        manh = router.manhattanize_point_list(start_dir, (shield_start[0], start_layer), router.route_points)
+        pt = (round(manh[-1][0][0] + offset * end[0], 3),
+              round(manh[-1][0][1] + offset * end[1], 3))
+        entries.append((pt, manh[-1][1], rpd_temp[_quantize_pt(manh[-1][0])]))
+        manh_offset.append((pt, manh[-1][1]))
+        router.add_route_points_bulk(entries)
 
-        return router, manh, shield_start
+        return router, manh_offset, shield_start
 
     def cardinal_router(self,
                         points: List[Tuple] = None,
@@ -639,7 +674,7 @@ class EZRouter:
             points = self.route_points
         else:
             for point in points:
-                self.route_point_dict[tuple(point[0])] = self.config[point[1]]['width']
+                self.route_point_dict[_quantize_pt(point[0])] = self.config[point[1]]['width']
 
         current_dir = self.current_dir
         current_point = (self.current_rect[self.current_handle].xy, self.current_rect.layer)
@@ -654,11 +689,22 @@ class EZRouter:
                                                        initial_point=current_point,
                                                        points=points)
 
-        for i in range(len(manh_point_list)):
-            point = manh_point_list[i]
-            if tuple(point[0]) not in self.route_point_dict:
-                if i != 0:
-                    self.route_point_dict[tuple(point[0])] = self.route_point_dict[tuple(manh_point_list[i - 1][0])]
+        # Normalize each point's dict key once and carry the previous point's width in a
+        # local, leaving a single dict get per point instead of a containment test plus
+        # two lookups on every propagation
+        rpd = self.route_point_dict
+        prev_key = None
+        prev_w = _MISSING
+        for i, point in enumerate(manh_point_list):
+            key = _quantize_pt(point[0])
+            w = rpd.get(key, _MISSING)
+            if w is _MISSING and i != 0:
+                if prev_w is _MISSING:
+                    raise KeyError(prev_key)
+                w = prev_w
+                rpd[key] = w
+            prev_key = key
+            prev_w = w
 
         # Simplify the point list so that each point corresponds with a bend of the route, i.e. no co-linear points
         # final_point_list = manh_point_list[1:]  # Ignore the first pt, since it is co-incident with the starting port
@@ -671,31 +717,20 @@ class EZRouter:
         # print('---In cardinal router, final_point_list:')
         # print(final_point_list)
 
-        # Draw a series of L-routes to follow the final simplified point list
-        # for pt0, pt1 in zip(final_point_list, final_point_list[1:]):
-            # print(f'drawing route {pt0[0]} -> {pt1[0]} on layer {pt0[1]}')
-        for index_point in range(1, len(final_point_list) - 1):
-            # print(' ')
-            # print('Drawing route with width from %s to %s and turn towards %s'
-            #       % (final_point_list[index_point - 1], final_point_list[index_point],
-            #          final_point_list[index_point + 1]))
-            self._draw_route_segment(pt0=final_point_list[index_point],
-                                     pt1=final_point_list[index_point + 1],
-                                     in_width=self.route_point_dict[tuple(final_point_list[index_point - 1][0])],
-                                     out_width=self.route_point_dict[tuple(final_point_list[index_point][0])],
-                                     enc_style=enc_style,
-                                     prim=prim)
-
-        # The loop does not draw the final straight segment, so add it here
-        # print(' ')
-        # print('Drawing route with width from %s to %s and stop'
-        #       % (final_point_list[index_point - 1], final_point_list[index_point]))
-        self._draw_route_segment(pt0=final_point_list[-1],
-                                 pt1=None,
-                                 in_width=self.route_point_dict[tuple(final_point_list[-1][0])],
-                                 out_width=self.route_point_dict[tuple(final_point_list[-1][0])],
-                                 enc_style='uniform',
-                                 prim=prim)
+        # Draw a series of L-routes to follow the final simplified point list. All the
+        # segments are collected up front and handed to the bulk drawing pass in one call
+        segs = [(final_point_list[index_point],
+                 final_point_list[index_point + 1],
+                 self.route_point_dict[_quantize_pt(final_point_list[index_point - 1][0])],
+                 self.route_point_dict[_quantize_pt(final_point_list[index_point][0])],
+                 enc_style)
+                for index_point in range(1, len(final_point_list) - 1)]
+
+        # The loop above does not cover the final straight segment, so add it here
+        final_width = self.route_point_dict[_quantize_pt(final_point_list[-1][0])]
+        segs.append((final_point_list[-1], None, final_width, final_width, 'uniform'))
+
+        self._draw_route_segments_bulk(segs, prim=prim)
 
         # Clear instance variables for future routes
         if clear_route:
@@ -736,6 +771,39 @@ class EZRouter:
         prim : bool
             True to use primitive vias
 
+        Returns
+        -------
+        self : AutoRouter
+            Return self to make it easy to cascade connections
+        """
+        return self._draw_route_segments_bulk([(pt0, pt1, in_width, out_width, enc_style)],
+                                              enc_bot=enc_bot,
+                                              enc_top=enc_top,
+                                              prim=prim)
+
+    def _draw_route_segments_bulk(self,
+                                  segs: List[tuple],
+                                  enc_bot: Optional[List[float]] = None,
+                                  enc_top: Optional[List[float]] = None,
+                                  prim: bool = True
+                                  ) -> 'EZRouter':
+        """
+        Draws a series of route segments in one pass. Validates the router state and binds
+        the drawing methods once for the whole batch rather than per segment, which matters
+        for networks with many waypoints
+
+        Parameters
+        ----------
+        segs : List[tuple]
+            List of (pt0, pt1, in_width, out_width, enc_style) entries with the same meaning
+            as the _draw_route_segment parameters
+        enc_bot : Optional[List[float]]
+            If provided, will use these enclosure settings for the bottom layer of the vias
+        enc_top : Optional[List[float]]
+            If provided, will use these enclosure settings for the top layer of the vias
+        prim : bool
+            True to use primitive vias
+
         Returns
         -------
         self : AutoRouter
@@ -744,54 +812,56 @@ class EZRouter:
         if not self.current_rect or not self.current_handle or not self.current_dir:
             raise ValueError('Router has not been initialized, please call new_route()')
 
-        # print('In _draw_route_segment, in_width = %f, out_width = %f'
-        #       % (in_width,out_width))
-        # print('In _draw_route_segment, pt0=%s, pt1=%s' % (str(pt0), str(pt1)))
+        draw_straight_route = self.draw_straight_route
+        draw_via = self.draw_via
 
-        # Draw the first straight route segment
-        self.draw_straight_route(loc=pt0[0], width=in_width)
+        for pt0, pt1, in_width, out_width, enc_style in segs:
+            # Draw the first straight route segment
+            draw_straight_route(loc=pt0[0], width=in_width)
 
-        # Draw the via to turn the l-route
-        # If an output width is not provided, use the same as the current width
-        if not out_width:
-            if self.current_dir == '+x' or self.current_dir == '-x':
-                out_width = self.current_rect.get_dim('y')
-            else:
-                out_width = self.current_rect.get_dim('x')
-        # Determine the output direction by checking the displacement to the next point
-        # in the list
-        if pt1:
-            # TODO: Handle co-linear points properly here
-            if self.current_dir == '+x' or self.current_dir == '-x':
-                if self.current_rect[self.current_handle].y < XY(pt1[0]).y:
-                    direction = '+y'
-                elif self.current_rect[self.current_handle].y == XY(pt1[0]).y and self.current_rect[self.current_handle].x < XY(pt1[0]).x:
-                    direction = '+x'
-                elif self.current_rect[self.current_handle].y == XY(pt1[0]).y:
-                    direction = '-x'
+            # Draw the via to turn the l-route
+            # If an output width is not provided, use the same as the current width
+            if not out_width:
+                if self.current_dir == '+x' or self.current_dir == '-x':
+                    out_width = self.current_rect.get_dim('y')
                 else:
-                    direction = '-y'
-            else:
-                if self.current_rect[self.current_handle].x < XY(pt1[0]).x:
-                    direction = '+x'
-                elif self.current_rect[self.current_handle].x == XY(pt1[0]).x and self.current_rect[self.current_handle].y < XY(pt1[0]).y:
-                    direction = '+y'
-                elif self.current_rect[self.current_handle].x == XY(pt1[0]).x:
-                    direction = '-y'
+                    out_width = self.current_rect.get_dim('x')
+            # Determine the output direction by checking the displacement to the next point
+            # in the list
+            if pt1:
+                # TODO: Handle co-linear points properly here
+                curr_xy = self.current_rect[self.current_handle]
+                next_xy = XY(pt1[0])
+                if self.current_dir == '+x' or self.current_dir == '-x':
+                    if curr_xy.y < next_xy.y:
+                        direction = '+y'
+                    elif curr_xy.y == next_xy.y and curr_xy.x < next_xy.x:
+                        direction = '+x'
+                    elif curr_xy.y == next_xy.y:
+                        direction = '-x'
+                    else:
+                        direction = '-y'
                 else:
-                    direction = '-x'
-        # If no next point is provided because it is at the end of the route, just use the
-        # current direction.
-        # TODO: Figure out if this is really the best way to go...
-        else:
-            direction = self.current_dir
-        self.draw_via(layer=pt0[1],
-                      direction=direction,
-                      enc_style=enc_style,
-                      out_width=out_width,
-                      enc_top=enc_top,
-                      enc_bot=enc_bot,
-                      prim=prim)
+                    if curr_xy.x < next_xy.x:
+                        direction = '+x'
+                    elif curr_xy.x == next_xy.x and curr_xy.y < next_xy.y:
+                        direction = '+y'
+                    elif curr_xy.x == next_xy.x:
+                        direction = '-y'
+                    else:
+                        direction = '-x'
+            # If no next point is provided because it is at the end of the route, just use the
+            # current direction.
+            # TODO: Figure out if this is really the best way to go...
+            else:
+                direction = self.current_dir
+            draw_via(layer=pt0[1],
+                     direction=direction,
+                     enc_style=enc_style,
+                     out_width=out_width,
+                     enc_top=enc_top,
+                     enc_bot=enc_bot,
+                     prim=prim)
         return self
 
     @staticmethod
@@ -858,21 +928,54 @@ class EZRouter:
                 else:
                     current_dir = 'x'
 
-        # Remove any co-linear points that are on the same metal layer
-        del_idx = []
-        for i in range(len(manh_point_list) - 2):
-            pt0 = manh_point_list[i]
-            pt1 = manh_point_list[i + 1]
-            pt2 = manh_point_list[i + 2]
+        # Remove any co-linear points that are on the same metal layer. Long lists are
+        # classified with one vectorized pass over the stacked coordinates; short ones
+        # use a scalar pass testing each interior point against its original neighbors
+        if len(manh_point_list) > 64:
+            keep = EZRouter._colinear_keep_mask(manh_point_list)
+            return [pt for pt, k in zip(manh_point_list, keep) if k]
+
+        last = len(manh_point_list) - 1
+        out = manh_point_list[:1]
+        for i in range(1, len(manh_point_list)):
+            if i < last:
+                (x0, y0), layer0 = manh_point_list[i - 1]
+                (x1, y1), layer1 = manh_point_list[i]
+                (x2, y2), layer2 = manh_point_list[i + 1]
+
+                if layer0 == layer1 == layer2:
+                    if x0 == x1 == x2 and (y0 <= y1 <= y2 or y0 >= y1 >= y2):
+                        continue
+                    if y0 == y1 == y2 and (x0 <= x1 <= x2 or x0 >= x1 >= x2):
+                        continue
+            out.append(manh_point_list[i])
+
+        return out
+
+    @staticmethod
+    def _colinear_keep_mask(manh_point_list):
+        """
+        Vectorized equivalent of the scalar co-linear point test: returns a bool array
+        marking the points to keep. Layers are encoded to small ints once so the
+        per-triple comparisons all run as numpy array ops
+        """
+        layer_codes = {}
+        lay = np.fromiter((layer_codes.setdefault(p[1], len(layer_codes)) for p in manh_point_list),
+                          dtype=np.int64, count=len(manh_point_list))
+        pts = np.array([(p[0][0], p[0][1]) for p in manh_point_list], dtype=np.float64)
+        x = pts[:, 0]
+        y = pts[:, 1]
+
+        x0, x1, x2 = x[:-2], x[1:-1], x[2:]
+        y0, y1, y2 = y[:-2], y[1:-1], y[2:]
+        same_layer = (lay[:-2] == lay[1:-1]) & (lay[1:-1] == lay[2:])
 
-            if pt0[0][0] == pt1[0][0] == pt2[0][0] and (pt0[0][1] <= pt1[0][1] <= pt2[0][1] or pt0[0][1] >= pt1[0][1]
-                                                        >= pt2[0][1]) and pt0[1] == pt1[1] == pt2[1]:
-                del_idx.append(i + 1)
-            elif pt0[0][1] == pt1[0][1] == pt2[0][1] and (pt0[0][0] <= pt1[0][0] <= pt2[0][0] or pt0[0][0] >= pt1[0][0]
-                                                          >= pt2[0][0]) and pt0[1] == pt1[1] == pt2[1]:
-                del_idx.append(i + 1)
+        colinear_x = (x0 == x1) & (x1 == x2) & (((y0 <= y1) & (y1 <= y2)) | ((y0 >= y1) & (y1 >= y2)))
+        colinear_y = (y0 == y1) & (y1 == y2) & (((x0 <= x1) & (x1 <= x2)) | ((x0 >= x1) & (x1 >= x2)))
 
-        return [manh_point_list[i] for i in range(len(manh_point_list)) if i not in del_idx]
+        keep = np.ones(len(manh_point_list), dtype=bool)
+        keep[1:-1] = ~(same_layer & (colinear_x | colinear_y))
+        return keep
 
     def add_relative_route_point(self,
                                  ref_rect: Rectangle,
@@ -889,7 +992,7 @@ class EZRouter:
         temp_point = ref_rect.loc[ref_handle]
         offset_point = XY([temp_point.x + offset[0], temp_point.y + offset[1]])
         self.route_points.append((offset_point, layer))
-        self.route_point_dict[offset_point] = width
+        self.route_point_dict[_quantize_pt(offset_point)] = width
 
 
     ''' Old Routing Methods to be Deprecated '''
@@ -3,8 +3,76 @@ from .Rectangle import Rectangle
 from .XY import XY
 from .tech import tech_info
 from typing import Tuple, Union, Optional, List, Dict
-from .AutoRouter import EZRouter
-import copy
+from .AutoRouter import EZRouter, _MISSING, _quantize_pt
+from dataclasses import dataclass
+import array
+import math
+import numpy as np
+
+# Bitmask encoding for BFS grid cells. BFS labels live in the low bits and the
+# special states each get their own flag bit, so classifying a cell takes a
+# single mask-and-test instead of a chain of comparisons
+GRID_EMPTY = 0  # unlabeled cell
+GRID_OOB = 1 << 27  # padding outside a layer's usable grid area
+GRID_END = 1 << 28  # endpoint cell
+GRID_START = 1 << 29  # start cell
+GRID_OBS = 1 << 30  # obstructed cell
+GRID_LABEL_MASK = (1 << 27) - 1  # low bits hold the BFS label
+# Cells that BFS may never expand into: anything except empty or the endpoint
+GRID_BLOCKED = GRID_OBS | GRID_START | GRID_OOB | GRID_LABEL_MASK
+
+# Bit layout for packed BFS frontier entries: i in bits 0-19, j in bits 20-39,
+# layer index in bits 40-55, incoming direction code in bits 56-58. Packing each
+# entry into one int avoids allocating a tuple per queue push, and the incoming
+# direction lets the expansion skip re-reading the cell it arrived from
+PACK_J_SHIFT = 20
+PACK_LAYER_SHIFT = 40
+PACK_DIR_SHIFT = 56
+PACK_COORD_MASK = (1 << 20) - 1
+PACK_LAYER_MASK = (1 << 16) - 1
+# Direction codes: 0 = +x, 1 = -x, 2 = +y, 3 = -y (opposite of d is d ^ 1);
+# 7 means no direction (seeds and inter-layer moves, which are never pruned
+# since the adjacency maps between layers of different pitch are not bijective)
+PACK_DIR_NONE = 7
+
+# Frontier size above which a BFS level is expanded with vectorized numpy ops
+# instead of the scalar loop; small levels stay scalar to avoid numpy call overhead
+NP_FRONTIER_THRESHOLD = 32
+
+# Frontier size above which a vectorized BFS level is sorted into Z-order before
+# the gather/scatter phase; below this the argsort costs more than the locality buys
+MORTON_SORT_THRESHOLD = 1024
+
+
+def _morton_codes(i_arr, j_arr):
+    """
+    Interleaves the bits of two coordinate arrays into 2D Morton (Z-order) codes
+    via the standard magic-bits spread. Cells that are close in (i, j) end up
+    close in Morton order, so processing a BFS level in this order turns random
+    grid accesses into cache-friendly ones
+    """
+    def spread(v):
+        v = v.astype(np.uint64)
+        v = (v | (v << np.uint64(16))) & np.uint64(0x0000FFFF0000FFFF)
+        v = (v | (v << np.uint64(8))) & np.uint64(0x00FF00FF00FF00FF)
+        v = (v | (v << np.uint64(4))) & np.uint64(0x0F0F0F0F0F0F0F0F)
+        v = (v | (v << np.uint64(2))) & np.uint64(0x3333333333333333)
+        v = (v | (v << np.uint64(1))) & np.uint64(0x5555555555555555)
+        return v
+
+    return spread(i_arr) | (spread(j_arr) << np.uint64(1))
+
+
+@dataclass(frozen=True, slots=True)
+class _LayerConfig:
+    """
+    Immutable per-layer router settings. Slot-based attribute access replaces the
+    nested dict lookups (config[layer]['spacing'] etc.) that the router otherwise
+    repeats for every point it touches
+    """
+    direction: str
+    spacing: float
+    width: float
 
 
 class EZRouterExtension(EZRouter):
@@ -26,6 +94,14 @@ class EZRouterExtension(EZRouter):
         self.grids = {}  # Dictionary containing grid 2D array for each layer
         self.dims = {}  # Dictionary of array dimensions for each layer
         self.routing_layers = []  # List of layers to route on
+        self._precompute_key = None  # (layers, dims) signature of the cached BFS lookup tables
+
+        # Bind each routing layer's settings to a slotted record so the router
+        # does attribute loads instead of nested dict lookups
+        self._layer_cfg = {layer: _LayerConfig(direction=self.config[layer]['direction'],
+                                               spacing=self.config[layer]['spacing'],
+                                               width=self.config[layer]['width'])
+                           for layer in tech_info['metal_tech']['routing'] if layer in self.config}
 
     def draw_straight_route_shield(self,
                                    loc: Union[Tuple[float, float], XY],
@@ -120,24 +196,41 @@ class EZRouterExtension(EZRouter):
 
         # Create perpendicular shields
 
-        for layer in shield_layers:
-            perpendicular_stripes = []
-            i = 0
-
-            while (i + 1) * width + i * perpendicular_pitch < length:
-                g_temp = self.gen.add_rect(layer)
-                if dir == 'r':
-                    g_temp.set_dim('x', width)
-                    g_temp.align('ul', rect_1, 'ul', offset=((width + perpendicular_pitch) * i, 0))
-                    g_temp.stretch('b', rect_2, 'b')
-                else:
-                    g_temp.set_dim('y', width)
-                    g_temp.align('ll', rect_1, 'll', offset=(0, (width + perpendicular_pitch) * i))
-                    g_temp.stretch('r', rect_2, 'r')
-                self.gen.connect_wires(g_temp, rect_1)
-                self.gen.connect_wires(g_temp, rect_2)
-                perpendicular_stripes.append(g_temp)
-                i += 1
+        # The stripe count is closed-form: stripe i starts at i * pitch and must fit a
+        # full width before the end of the route, so the loop bound is computed once
+        # instead of redoing the arithmetic in the loop condition every iteration
+        pitch = width + perpendicular_pitch
+        num_stripes = max(0, math.ceil(round((length - width) / pitch, 9)))
+
+        # Bind the generator methods once; the loop below calls them per stripe
+        add_rect = self.gen.add_rect
+        connect_wires = self.gen.connect_wires
+        copy_rect = self.gen.copy_rect
+
+        # The orientation branch is loop-invariant, so the handles and per-stripe
+        # offsets are chosen once up front rather than re-branching per stripe
+        if dir == 'r':
+            dim_axis, align_handle, stretch_handle = 'x', 'ul', 'b'
+            offsets = [(pitch * i, 0) for i in range(num_stripes)]
+        else:
+            dim_axis, align_handle, stretch_handle = 'y', 'll', 'r'
+            offsets = [(0, pitch * i) for i in range(num_stripes)]
+
+        # Each stripe's geometry is identical on every shield layer, so it is sized,
+        # aligned, and stretched once and then copied onto the remaining layers
+        # (the old loop redid the geometry work per layer and kept the stripes in a
+        # list that nothing ever read)
+        for offset in offsets:
+            g_temp = add_rect(shield_layers[0])
+            g_temp.set_dim(dim_axis, width)
+            g_temp.align(align_handle, rect_1, align_handle, offset=offset)
+            g_temp.stretch(stretch_handle, rect_2, stretch_handle)
+            connect_wires(g_temp, rect_1)
+            connect_wires(g_temp, rect_2)
+            for layer in shield_layers[1:]:
+                g_copy = copy_rect(g_temp, layer=layer)
+                connect_wires(g_copy, rect_1)
+                connect_wires(g_copy, rect_2)
 
         return self
 
@@ -187,90 +280,158 @@ class EZRouterExtension(EZRouter):
         """
         points = self.route_points
         self.new_route_from_location(start_pt, start_dir, start_layer, start_width)
-        self.route_point_dict[start_pt] = start_width
+        self.route_point_dict[_quantize_pt(start_pt)] = start_width
 
         # Route the signal
         self.cardinal_router(enc_style=enc_style, prim=prim, clear_route=False)
         manh = self.manhattanize_point_list(start_dir, (start_pt, start_layer), points)
 
         # Create and route routing networks for shields
-        router1, _, _ = self.cardinal_helper(self, manh, start_pt, start_dir, start_layer, parallel_spacing)
-        router2, _, _ = self.cardinal_helper(self, manh, start_pt, start_dir, start_layer, -parallel_spacing)
-
-        router1.cardinal_router(enc_style=enc_style, prim=prim)
-        router2.cardinal_router(enc_style=enc_style, prim=prim)
+        router1, router2 = self._build_parallel_routers(manh, start_pt, start_dir, start_layer,
+                                                        (parallel_spacing, -parallel_spacing),
+                                                        enc_style=enc_style, prim=prim)
 
         # Find all parallel shield pairs to be connected by perpendicular shields ignoring rectangles created for vias
-        max_w = max(self.route_point_dict.values())
+        router1_rects, bounds1 = self._filter_route_rects(router1.loc['rect_list'][1:])
+        router2_rects, bounds2 = self._filter_route_rects(router2.loc['rect_list'][1:])
+
+        # One scratch virtual rect is reused for every candidate trace below; each
+        # iteration fully re-determines its geometry (set_dim + align + stretch fix
+        # all four corners), and passing candidates are promoted with copy_rect, so
+        # only accepted traces allocate real rectangles
+        scratch = self.gen.add_rect(shield_layers[0], virtual=True)
+
+        # Bind the generator methods once; the stripe loops below call them per trace
+        copy_rect = self.gen.copy_rect
+        connect_wires = self.gen.connect_wires
+
+        # Iterate over each pair of shields, unpacking the paired rects, their bounds
+        # rows, and the matching route point in one iterator instead of indexing
+        # four sequences per trip
+        rpd = self.route_point_dict
+        for rect_1, rect_2, b1, b2, manh_entry in zip(router1_rects, router2_rects,
+                                                      bounds1, bounds2, manh[1:]):
+            # The trace width and pitch do not depend on the trace orientation,
+            # so they are computed once per pair ahead of the branch
+            width = rpd[_quantize_pt(manh_entry[0])]
+            pitch = width + perpendicular_pitch
 
-        router1_rects = [i for i in router1.loc['rect_list'][1:] if
-             round(i.ur.x - i.ll.x, 3) > max_w or round(i.ur.y - i.ll.y, 3) > max_w]
-        router2_rects = [i for i in router2.loc['rect_list'][1:] if
-             round(i.ur.x - i.ll.x, 3) > max_w or round(i.ur.y - i.ll.y, 3) > max_w]
+            # If horizontal trace
+            if b1[2] - b1[0] > b1[3] - b1[1]:
+                # Pick the extreme rects by comparing rows of the precomputed
+                # bounds array; min/max with a key lambda paid a callable
+                # dispatch per bound for every shield pair
+                if b1[3] >= b2[3]:
+                    top, top_b = rect_1, b1
+                else:
+                    top, top_b = rect_2, b2
+                if b1[1] <= b2[1]:
+                    bottom, bot_b = rect_1, b1
+                else:
+                    bottom, bot_b = rect_2, b2
+                right_edge = b1[2] if b1[2] <= b2[2] else b2[2]
+                start = top_b[0]
 
-        shield_pairs = list(zip(router1_rects, router2_rects))
+                # Iterate over length of shield traces to add perpendicular traces at the given
+                # pitch; the trace count is closed-form so the loop bound is computed once
+                num_traces = max(0, math.ceil(round((right_edge - start - width - 1) / pitch, 9)))
 
-        # Iterate over each pair of shields
-        for i in range(len(shield_pairs)):
-            rect_1 = shield_pairs[i][0]
-            rect_2 = shield_pairs[i][1]
-            rects = [rect_1, rect_2]
+                # Nothing fits between short shield pairs; skip the loop setup entirely
+                if num_traces == 0:
+                    continue
 
-            # If horizontal trace
-            if rect_1.ur.x - rect_1.ll.x > rect_1.ur.y - rect_1.ll.y:
-                top = max(rects, key=lambda x: x.ur.y)
-                bottom = min(rects, key=lambda x: x.ll.y)
-                right = min(rects, key=lambda x: x.ur.x)
-                start = top.ll.x
-
-                # Iterate over length of shield traces to add perpendicular traces at the given pitch
-                j = 0
-                width = self.route_point_dict[tuple(manh[i + 1][0])]
-                while start + (j + 1) * width + j * perpendicular_pitch + 1 < right.ur.x:
-                    g_temp = self.gen.add_rect(shield_layers[0], virtual=True)
+                # The shield bounds are loop-invariant, so they are hoisted and the
+                # axis-aligned overlap test is inlined against them
+                top_ll_x, top_ll_y, top_ur_x, top_ur_y = top_b
+                bot_ll_x, bot_ll_y, bot_ur_x, bot_ur_y = bot_b
 
+                for j in range(num_traces):
                     # Align trace with top shield and stretch to bottom shield if it overlaps with both shields
-                    g_temp.set_dim('x', width)
-                    g_temp.align('ul', top, 'ul', offset=((width + perpendicular_pitch) * j + .5, 0))
-                    g_temp.stretch('b', bottom, 'b')
-
-                    if Rectangle.overlap(g_temp, top) and Rectangle.overlap(g_temp, bottom):
+                    scratch.set_dim('x', width)
+                    scratch.align('ul', top, 'ul', offset=(pitch * j + .5, 0))
+                    scratch.stretch('b', bottom, 'b')
+
+                    g_ll = scratch.ll
+                    g_ur = scratch.ur
+                    if (g_ll.x < top_ur_x and g_ur.x > top_ll_x and g_ll.y < top_ur_y and g_ur.y > top_ll_y
+                            and g_ll.x < bot_ur_x and g_ur.x > bot_ll_x and g_ll.y < bot_ur_y and g_ur.y > bot_ll_y):
                         for layer in shield_layers:
-                            g_temp = self.gen.copy_rect(g_temp, virtual=False, layer=layer)
-                            self.gen.connect_wires(g_temp, rect_1)
-                            self.gen.connect_wires(g_temp, rect_2)
-
-                    j += 1
+                            g_temp = copy_rect(scratch, virtual=False, layer=layer)
+                            connect_wires(g_temp, rect_1)
+                            connect_wires(g_temp, rect_2)
 
             # If vertical trace
             else:
-                top = min(rects, key=lambda x: x.ur.y)
-                left = min(rects, key=lambda x: x.ll.x)
-                right = max(rects, key=lambda x: x.ur.x)
+                top_edge = b1[3] if b1[3] <= b2[3] else b2[3]
+                if b1[0] <= b2[0]:
+                    left, left_b = rect_1, b1
+                else:
+                    left, left_b = rect_2, b2
+                if b1[2] >= b2[2]:
+                    right, right_b = rect_1, b1
+                else:
+                    right, right_b = rect_2, b2
 
-                start = left.ll.y
+                start = left_b[1]
 
-                # Iterate over length of shield traces to add perpendicular traces at the given pitch
-                j = 0
-                width = self.route_point_dict[tuple(manh[i + 1][0])]
-                while start + (j + 1) * width + j * perpendicular_pitch + 1 < top.ur.y:
-                    g_temp = self.gen.add_rect(shield_layers[0], virtual=True)
+                # Iterate over length of shield traces to add perpendicular traces at the given
+                # pitch; the trace count is closed-form so the loop bound is computed once
+                num_traces = max(0, math.ceil(round((top_edge - start - width - 1) / pitch, 9)))
 
-                    # Align trace with left shield and stretch to right shield if it overlaps with both shields
-                    g_temp.set_dim('y', width)
-                    g_temp.align('ll', left, 'll', offset=(0, (width + perpendicular_pitch) * j + .5))
-                    g_temp.stretch('r', right, 'r')
+                # Nothing fits between short shield pairs; skip the loop setup entirely
+                if num_traces == 0:
+                    continue
 
-                    if Rectangle.overlap(g_temp, left) and Rectangle.overlap(g_temp, right):
-                        for layer in shield_layers:
-                            g_temp = self.gen.copy_rect(g_temp, virtual=False, layer=layer)
-                            self.gen.connect_wires(g_temp, rect_1)
-                            self.gen.connect_wires(g_temp, rect_2)
+                # The shield bounds are loop-invariant, so they are hoisted and the
+                # axis-aligned overlap test is inlined against them
+                left_ll_x, left_ll_y, left_ur_x, left_ur_y = left_b
+                right_ll_x, right_ll_y, right_ur_x, right_ur_y = right_b
 
-                    j += 1
+                for j in range(num_traces):
+                    # Align trace with left shield and stretch to right shield if it overlaps with both shields
+                    scratch.set_dim('y', width)
+                    scratch.align('ll', left, 'll', offset=(0, pitch * j + .5))
+                    scratch.stretch('r', right, 'r')
+
+                    g_ll = scratch.ll
+                    g_ur = scratch.ur
+                    if (g_ll.x < left_ur_x and g_ur.x > left_ll_x and g_ll.y < left_ur_y and g_ur.y > left_ll_y
+                            and g_ll.x < right_ur_x and g_ur.x > right_ll_x and g_ll.y < right_ur_y and g_ur.y > right_ll_y):
+                        for layer in shield_layers:
+                            g_temp = copy_rect(scratch, virtual=False, layer=layer)
+                            connect_wires(g_temp, rect_1)
+                            connect_wires(g_temp, rect_2)
 
         return self
 
+    def _build_parallel_routers(self, manh, start_pt, start_dir, start_layer, offsets,
+                                enc_style: str = 'uniform', prim: bool = False) -> list:
+        """
+        Creates and routes one copy of the given manhattanized route per offset in
+        offsets, each shifted off the center path by that amount. Shared driver for
+        the shield and diff pair routers, which previously each spelled out the same
+        build-then-route sequence
+        """
+        routers = [self.cardinal_helper(self, manh, start_pt, start_dir, start_layer, offset)[0]
+                   for offset in offsets]
+        for router in routers:
+            router.cardinal_router(enc_style=enc_style, prim=prim)
+        return routers
+
+    @staticmethod
+    def _filter_route_rects(rect_list):
+        """
+        Drops the via landing rects from the given rect list by their kind tag and
+        builds an (R, 4) array of (ll.x, ll.y, ur.x, ur.y) bounds for the surviving
+        wire rects. Returns the rects alongside their bounds rows so callers compare
+        coordinates out of the array instead of chasing XY attributes per rect
+        """
+        rects = [r for r in rect_list if r.kind == 'wire']
+        if not rects:
+            return [], np.empty((0, 4))
+        bounds = np.array([(r.ll.x, r.ll.y, r.ur.x, r.ur.y) for r in rects], dtype=np.float64)
+        return rects, bounds
+
     def diff_pair_router(self,
                          start_layer: str,
                          parallel_spacing: float,
@@ -308,21 +469,28 @@ class EZRouterExtension(EZRouter):
         """
         points = self.route_points
         manh = self.manhattanize_point_list(start_dir, (start_pt, start_layer), points)
-        self.route_point_dict[start_pt] = start_width
-
-        # Include new route points created by manhattanize_point_list in route_point_dict
-        for i in range(len(manh)):
-            point = manh[i]
-            if tuple(point[0]) not in self.route_point_dict:
-                if i != 0:
-                    self.route_point_dict[tuple(point[0])] = self.route_point_dict[tuple(manh[i - 1][0])]
+        self.route_point_dict[_quantize_pt(start_pt)] = start_width
+
+        # Include new route points created by manhattanize_point_list in route_point_dict,
+        # normalizing each point's key once and carrying the previous width in a local
+        rpd = self.route_point_dict
+        prev_key = None
+        prev_w = _MISSING
+        for i, point in enumerate(manh):
+            key = _quantize_pt(point[0])
+            w = rpd.get(key, _MISSING)
+            if w is _MISSING and i != 0:
+                if prev_w is _MISSING:
+                    raise KeyError(prev_key)
+                w = prev_w
+                rpd[key] = w
+            prev_key = key
+            prev_w = w
 
         # Create and route routing networks for diff pair
-        router1, _, _ = self.cardinal_helper(self, manh, start_pt, start_dir, start_layer, parallel_spacing / 2)
-        router2, _, _ = self.cardinal_helper(self, manh, start_pt, start_dir, start_layer, -parallel_spacing / 2)
-
-        router1.cardinal_router(enc_style=enc_style, prim=prim)
-        router2.cardinal_router(enc_style=enc_style, prim=prim)
+        self._build_parallel_routers(manh, start_pt, start_dir, start_layer,
+                                     (parallel_spacing / 2, -parallel_spacing / 2),
+                                     enc_style=enc_style, prim=prim)
 
         # Clear instance variables for future routes
         self.route_points = []
@@ -371,30 +539,26 @@ class EZRouterExtension(EZRouter):
         # Manhattanize center path
         points = self.route_points
         manh = self.manhattanize_point_list(start_dir, (start_pt, start_layer), points)
-        self.route_point_dict[start_pt] = start_width
-
-        # Include new route points created by manhattanize_point_list in route_point_dict
-        for i in range(len(manh)):
-            point = manh[i]
-            if tuple(point[0]) not in self.route_point_dict:
-                if i != 0:
-                    self.route_point_dict[tuple(point[0])] = self.route_point_dict[tuple(manh[i - 1][0])]
+        self.route_point_dict[_quantize_pt(start_pt)] = start_width
+
+        # Include new route points created by manhattanize_point_list in route_point_dict,
+        # normalizing each point's key once and carrying the previous width in a local
+        rpd = self.route_point_dict
+        prev_key = None
+        prev_w = _MISSING
+        for i, point in enumerate(manh):
+            key = _quantize_pt(point[0])
+            w = rpd.get(key, _MISSING)
+            if w is _MISSING and i != 0:
+                if prev_w is _MISSING:
+                    raise KeyError(prev_key)
+                w = prev_w
+                rpd[key] = w
+            prev_key = key
+            prev_w = w
 
         # Calculate sequence of routing directions
-        dirs = []
-
-        for i in range(len(manh) - 1):
-            pt0 = manh[i]
-            pt1 = manh[i + 1]
-
-            if pt0[0][0] > pt1[0][0]:
-                dirs.append('-x')
-            elif pt0[0][0] < pt1[0][0]:
-                dirs.append('+x')
-            elif pt0[0][1] > pt1[0][1]:
-                dirs.append('-y')
-            else:
-                dirs.append('+y')
+        dirs = self._compute_dirs(manh)
 
         top = (manh, self, start_pt)  # Current "topmost" shield
         bottom = (manh, self, start_pt)  # Current "bottommost" shield
@@ -410,14 +574,7 @@ class EZRouterExtension(EZRouter):
             num_iters = bus_size
 
         # Determine initial offset direction of routes from center
-        if start_pt[0] > manh[1][0][0]:
-            start = (0, -1)
-        elif start_pt[0] < manh[1][0][0]:
-            start = (0, 1)
-        elif start_pt[1] > manh[1][0][1]:
-            start = (1, 0)
-        else:
-            start = (-1, 0)
+        start = self._derive_normal(start_pt, manh[1][0])
 
         for j in range(num_iters):
             manh = top[0] if sign == 1 else bottom[0]
@@ -468,7 +625,8 @@ class EZRouterExtension(EZRouter):
         -----
         * Perform breadth-first search to find shortest path around obstructions
         * For a given 2D array grid, coordinate (i, j) is located at grid[j][i].
-        * 'O' denotes an obstruction at a grid square, 'S' denotes the start square, and 'E' denotes the end layer
+        * Grid squares are stored as small ints in a dense numpy array; GRID_OBS denotes an obstruction at a
+        grid square, GRID_START denotes the start square, and GRID_END denotes the end square
 
         Parameters
         ----------
@@ -504,24 +662,24 @@ class EZRouterExtension(EZRouter):
         self.route_point_dict = {}
 
         # Snap all input coordinates to grid
-        start_spacing = self.config[start_layer]['spacing']
+        layer_cfg = self._layer_cfg
+        start_spacing = layer_cfg[start_layer].spacing
         start = (round(start[0] / start_spacing) * start_spacing, round(start[1] / start_spacing) * start_spacing)
 
-        end_spacing = self.config[end_layer]['spacing']
+        end_spacing = layer_cfg[end_layer].spacing
         end = (round(end[0] / end_spacing) * end_spacing, round(end[1] / end_spacing) * end_spacing)
 
         # If routing area not defined, define it using bounds of start and end coordinates
         if not (routing_ll and routing_ur):
             for layer in layers:
-                # Determine grid size and initialize grid
-                x = round((max([end[0], start[0]]) - min([end[0], start[0]])) / self.config[layer]['spacing']) + 1
-                y = round((max([end[1], start[1]]) - min([end[1], start[1]])) / self.config[layer]['spacing']) + 1
-
-                grid = [[None for _ in range(x)] for _ in range(y)]
+                # Determine grid size for each layer
+                x = round((max([end[0], start[0]]) - min([end[0], start[0]])) / layer_cfg[layer].spacing) + 1
+                y = round((max([end[1], start[1]]) - min([end[1], start[1]])) / layer_cfg[layer].spacing) + 1
 
-                self.grids[layer] = grid
                 self.dims[layer] = (x, y)
 
+            self._init_grids(layers)
+
             start_dim = self.dims[start_layer]
             end_dim = self.dims[end_layer]
 
@@ -552,47 +710,64 @@ class EZRouterExtension(EZRouter):
         # If routing area has been provided
         else:
             for layer in layers:
-                layer_spacing = self.config[layer]['spacing']
+                layer_spacing = layer_cfg[layer].spacing
                 ur_temp = (round(routing_ur[0] / layer_spacing) * layer_spacing, round(routing_ur[1] / layer_spacing) * layer_spacing)
                 ll_temp = (round(routing_ll[0] / layer_spacing) * layer_spacing, round(routing_ll[1] / layer_spacing) * layer_spacing)
 
                 x = round((ur_temp[0] - ll_temp[0]) / layer_spacing) + 2
                 y = round((ur_temp[1] - ll_temp[1]) / layer_spacing) + 2
 
-                grid = [[None for _ in range(x)] for _ in range(y)]
-
-                self.grids[layer] = grid
                 self.dims[layer] = (x, y)
 
+            self._init_grids(layers)
+
             ll_pos = routing_ll
             ur_pos = routing_ur
 
             # Determine start and end grid coordinates relative to given routing area
-            start_coord = (round((start[0] - ll_pos[0]) / self.config[start_layer]['spacing']),
-                           round((start[1] - ll_pos[1]) / self.config[start_layer]['spacing']))
-            end_coord = (round((end[0] - ll_pos[0]) / self.config[end_layer]['spacing']),
-                           round((end[1] - ll_pos[1]) / self.config[end_layer]['spacing']))
-
-        # Mark start coordinate as 'S', end coordinate as 'E'
-        self.grids[start_layer][start_coord[1]][start_coord[0]] = 'S'
-        self.grids[end_layer][end_coord[1]][end_coord[0]] = 'E'
-
+            start_coord = (round((start[0] - ll_pos[0]) / start_spacing),
+                           round((start[1] - ll_pos[1]) / start_spacing))
+            end_coord = (round((end[0] - ll_pos[0]) / end_spacing),
+                           round((end[1] - ll_pos[1]) / end_spacing))
+
+        # The lookup tables only depend on the layer set and grid dimensions, so repeated
+        # routes over the same region (the common case when routing a bus) skip the rebuild
+        precompute_key = (tuple(layers), tuple(self.dims[layer] for layer in layers))
+        if precompute_key != self._precompute_key:
+            self._precompute_layer_constants(layers)
+            self._precompute_adjacency(layers)
+            self._precompute_key = precompute_key
+
+        # Mark the start and end coordinates on the grid
+        self.grids[start_layer][start_coord[1]][start_coord[0]] = GRID_START
+        self.grids[end_layer][end_coord[1]][end_coord[0]] = GRID_END
 
         obstructions = obstructions + self.loc['rect_list']
-        # Initialize obstructions on the grid
-        for rect in obstructions:
-            # If the obstructions are in the routing area
-            if rect and Rectangle.overlap(rect, Rectangle((ll_pos, ur_pos), '')) and rect.layer in layers:
-                rel_ll_coord = (rect.ll.x - ll_pos[0], rect.ll.y - ll_pos[1])
-                rel_ur_coord = (rect.ur.x - ll_pos[0], rect.ur.y - ll_pos[1])
-
-                # Determine grid coordinates of obstruction, fill in each obstructed grid square with 'O'
-                ll = round(rel_ll_coord[0] / self.config[rect.layer]['spacing']), round(rel_ll_coord[1] / self.config[rect.layer]['spacing'])
-                ur = round(rel_ur_coord[0] / self.config[rect.layer]['spacing']), round(rel_ur_coord[1] / self.config[rect.layer]['spacing'])
-
-                for j in range(max([ll[1], 0]), min([ur[1] + 1, self.dims[rect.layer][1]])):
-                    for i in range(max([ll[0], 0]), min([ur[0] + 1, self.dims[rect.layer][0]])):
-                        self.grids[rect.layer][j][i] = 'O'
+        # Initialize obstructions on the grid. Off-stack rects are dropped by the cheap
+        # layer test first; the surviving extents are stacked into one array so the
+        # routing-window overlap test runs as a single vectorized pass instead of a
+        # Rectangle.overlap call per obstruction
+        candidates = [rect for rect in obstructions if rect and rect.layer in layers]
+        if candidates:
+            ext = np.array([(r.ll.x, r.ll.y, r.ur.x, r.ur.y) for r in candidates], dtype=np.float64)
+            win_llx, win_lly = ll_pos[0], ll_pos[1]
+            win_urx, win_ury = ur_pos[0], ur_pos[1]
+            hits = ((ext[:, 0] < win_urx) & (win_llx < ext[:, 2])
+                    & (ext[:, 1] < win_ury) & (win_lly < ext[:, 3]))
+
+            for idx in np.nonzero(hits)[0]:
+                rect = candidates[idx]
+                llx, lly, urx, ury = ext[idx]
+                rel_ll_coord = (llx - win_llx, lly - win_lly)
+                rel_ur_coord = (urx - win_llx, ury - win_lly)
+
+                # Determine grid coordinates of obstruction and mark the obstructed region in one block write
+                rect_spacing = layer_cfg[rect.layer].spacing
+                ll = round(rel_ll_coord[0] / rect_spacing), round(rel_ll_coord[1] / rect_spacing)
+                ur = round(rel_ur_coord[0] / rect_spacing), round(rel_ur_coord[1] / rect_spacing)
+
+                self.grids[rect.layer][max([ll[1], 0]):min([ur[1] + 1, self.dims[rect.layer][1]]),
+                                       max([ll[0], 0]):min([ur[0] + 1, self.dims[rect.layer][0]])] = GRID_OBS
 
         # Perform first half of wave propagation algorithm to label each grid square
         self.label_node(start_layer, start_coord[0], start_coord[1])
@@ -601,30 +776,36 @@ class EZRouterExtension(EZRouter):
         path = [curr_node]
         grid = self.grids[curr_node[2]]
 
-        # for i in self.grids:
-        #     print("GRID")
-        #     for j in self.grids[i]:
-        #         print(j)
-
-
-        visited = copy.deepcopy(self.grids)
+        # Dense visited map for the backtrace: one byte per cell, indexed with the same
+        # flat stride as the grids. A bytearray keeps this allocation-free per lookup
+        # and far smaller than a copy of the grids
+        stride = self._stride
+        visited = {layer: bytearray(len(flat)) for layer, flat in self._flat_grids.items()}
 
         # Perform second half of wave propagation algorithm
         # Back propagate from end point by finding the minimum-value neighbor at each iteration
 
+        flat_grids = self._flat_grids
         while grid[curr_node[1]][curr_node[0]] != 1:
-            neighbors = self.get_neighbors(curr_node[2], curr_node[0], curr_node[1])
-            neighbors = [i for i in neighbors if type(self.grids[i[2]][i[1]][i[0]]) == int and visited[i[2]][i[1]][i[0]] != 'V']
-            curr_node = min(neighbors, key=lambda x: self.grids[x[2]][x[1]][x[0]])
-            visited[curr_node[2]][curr_node[1]][curr_node[0]] = 'V'
+            # Read each neighbor's cell exactly once: the old filter + min pair re-read
+            # every candidate through a chained subscript on both passes
+            candidates = []
+            for node in self.get_neighbors(curr_node[2], curr_node[0], curr_node[1]):
+                ni, nj, nl = node
+                flat_idx = nj * stride + ni
+                label = flat_grids[nl][flat_idx] & GRID_LABEL_MASK
+                if label and not visited[nl][flat_idx]:
+                    candidates.append((label, node))
+            curr_node = min(candidates, key=lambda c: c[0])[1]
+            visited[curr_node[2]][curr_node[1] * stride + curr_node[0]] = 1
             grid = self.grids[curr_node[2]]
             path.append(curr_node)
 
         # Convert grid coordinates to real coordinates
-        real_path = [((round(round(ll_pos[0] / self.config[i[2]]['spacing']) * self.config[i[2]]['spacing'] +
-                       self.config[i[2]]['spacing'] * i[0], 3),
-                       round(round(ll_pos[1] / self.config[i[2]]['spacing']) * self.config[i[2]]['spacing'] +
-                       self.config[i[2]]['spacing'] * i[1], 3)), i[2]) for i in path][::-1]
+        real_path = [((round(round(ll_pos[0] / layer_cfg[i[2]].spacing) * layer_cfg[i[2]].spacing +
+                       layer_cfg[i[2]].spacing * i[0], 3),
+                       round(round(ll_pos[1] / layer_cfg[i[2]].spacing) * layer_cfg[i[2]].spacing +
+                       layer_cfg[i[2]].spacing * i[1], 3)), i[2]) for i in path][::-1]
 
         next_pt = real_path[0][0]
 
@@ -662,87 +843,314 @@ class EZRouterExtension(EZRouter):
             real_path[i + 1] = pt1
 
         for point in real_path:
-            add_width = False if point[0] in self.route_point_dict else True
-            self.add_route_points([point[0]], point[1], self.config[point[1]]['width'], add_width=add_width)
+            add_width = False if _quantize_pt(point[0]) in self.route_point_dict else True
+            self.add_route_points([point[0]], point[1], layer_cfg[point[1]].width, add_width=add_width)
 
         # Route points
-        self.new_route_from_location(start, start_dir, start_layer, self.config[start_layer]['width'])
+        self.new_route_from_location(start, start_dir, start_layer, layer_cfg[start_layer].width)
         self.cardinal_router(prim=True)
 
         return self
 
+    def _init_grids(self, layers):
+        """Allocates a dense int16 grid array covering all layers and creates the 2D per-layer views"""
+        x_max = max(self.dims[layer][0] for layer in layers)
+        y_max = max(self.dims[layer][1] for layer in layers)
+
+        # Pad each layer's grid out to the largest layer's dimensions so that all layers
+        # live in one contiguous typed array. The padded region is marked out-of-bounds
+        self._grid_arr = np.full((len(layers), y_max, x_max), GRID_OOB, dtype=np.int32)
+        # Flat 1D views over each padded layer plane; indexing flat[j * stride + i] replaces
+        # a chained 2D subscript in the BFS hot loop. The padding keeps the stride safe
+        self._flat_grids = {}
+        self._stride = x_max
+        for idx, layer in enumerate(layers):
+            x, y = self.dims[layer]
+            self._grid_arr[idx, :y, :x] = GRID_EMPTY
+            self.grids[layer] = self._grid_arr[idx, :y, :x]
+            self._flat_grids[layer] = self._grid_arr[idx].reshape(-1)
+
+    def _precompute_layer_constants(self, layers):
+        """
+        Caches per-layer values that are constant for the duration of a BFS run so that get_neighbors
+        does not redo dict lookups and len() calls on every expansion
+        """
+        # Routing direction per layer as a small int code: 0 = 'x', 1 = 'y', 2 = 'xy'
+        self._direction_code = {layer: {'x': 0, 'y': 1, 'xy': 2}[self._layer_cfg[layer].direction]
+                                for layer in layers}
+        # Same-layer BFS steps as (dir_code, di, dj) tuples specialized per layer, so the
+        # expansion loops iterate a static table instead of re-branching on the layer's
+        # routing direction for every cell
+        self._layer_steps = {}
+        for layer, direction in self._direction_code.items():
+            steps = []
+            if direction != 1:  # 'x' or 'xy'
+                steps += [(0, 1, 0), (1, -1, 0)]
+            if direction != 0:  # 'y' or 'xy'
+                steps += [(2, 0, 1), (3, 0, -1)]
+            self._layer_steps[layer] = tuple(steps)
+        # Layer name <-> small int index mapping used by the packed frontier entries
+        self._layer_idx = {layer: idx for idx, layer in enumerate(layers)}
+        self._idx_layer = list(layers)
+        # Adjacent routing layers per layer, already filtered against the layers we may route
+        # on, so neighbor expansion does not rebuild and re-filter the list on every call
+        self._routing_layers_set = frozenset(layers)
+        all_layers = tech_info['metal_tech']['routing']
+        self._layer_neighbors = {}
+        for layer in layers:
+            stack_idx = all_layers.index(layer)
+            neighboring_layers = []
+            if stack_idx + 1 < len(all_layers):
+                neighboring_layers.append(all_layers[stack_idx + 1])
+            if stack_idx - 1 >= 0:
+                neighboring_layers.append(all_layers[stack_idx - 1])
+            self._layer_neighbors[layer] = tuple(l for l in neighboring_layers
+                                                 if l in self._routing_layers_set)
+        # Terminal layers (top/bottom of the routing stack) have no inter-layer
+        # neighbors at all; this flag lets the BFS skip that branch outright
+        self._has_interlayer = {layer: bool(self._layer_neighbors[layer]) for layer in layers}
+
+    def _precompute_adjacency(self, layers):
+        """
+        Builds lookup tables mapping grid coordinates on each layer to the corresponding coordinates on its
+        neighboring routing layers. Since find_adjacent scales each axis independently, a 1D table per axis
+        is enough; get_neighbors then replaces a method call per inter-layer candidate with two array loads
+        """
+        self._adj_i = {}
+        self._adj_j = {}
+        self._adj_i_arr = {}
+        self._adj_j_arr = {}
+        self._adj_valid_i = {}
+        self._adj_valid_j = {}
+        self._adj_valid_i_arr = {}
+        self._adj_valid_j_arr = {}
+        all_layers = tech_info['metal_tech']['routing']
+        for from_layer in layers:
+            layer_idx = all_layers.index(from_layer)
+            for to_layer in all_layers[max(layer_idx - 1, 0):layer_idx + 2]:
+                if to_layer == from_layer or to_layer not in layers:
+                    continue
+                x, y = self.dims[from_layer]
+                # The transform between two layers' grids is a scale by the spacing
+                # ratio, evaluated as multiply-then-divide exactly like find_adjacent:
+                # pre-dividing the spacings reassociates the floats and snaps some
+                # exact half-pitch coordinates to a different track. np.rint rounds
+                # half to even, matching Python's round
+                spacing1 = self._layer_cfg[from_layer].spacing
+                spacing2 = self._layer_cfg[to_layer].spacing
+                map_i = np.rint((np.arange(x) * spacing1) / spacing2).astype(np.int64)
+                map_j = np.rint((np.arange(y) * spacing1) / spacing2).astype(np.int64)
+                self._adj_i_arr[(from_layer, to_layer)] = map_i
+                self._adj_j_arr[(from_layer, to_layer)] = map_j
+                # Plain-list copies for the scalar paths, where list indexing is cheaper
+                self._adj_i[(from_layer, to_layer)] = map_i.tolist()
+                self._adj_j[(from_layer, to_layer)] = map_j.tolist()
+                # The bounds test on the destination layer is separable per axis, so it
+                # is precomputed here as one validity mask per axis instead of being
+                # recomputed from self.dims for every candidate at runtime
+                valid_i = map_i < self.dims[to_layer][0]
+                valid_j = map_j < self.dims[to_layer][1]
+                self._adj_valid_i_arr[(from_layer, to_layer)] = valid_i
+                self._adj_valid_j_arr[(from_layer, to_layer)] = valid_j
+                self._adj_valid_i[(from_layer, to_layer)] = valid_i.tolist()
+                self._adj_valid_j[(from_layer, to_layer)] = valid_j.tolist()
+
     def find_adjacent(self, layer1, layer2, i, j):
         """Determine the corresponding grid square to a given grid square on an adjacent layer"""
-        spacing1 = self.config[layer1]['spacing']
-        spacing2 = self.config[layer2]['spacing']
+        spacing1 = self._layer_cfg[layer1].spacing
+        spacing2 = self._layer_cfg[layer2].spacing
         return round((i * spacing1) / spacing2), round((j * spacing1) / spacing2)
 
     def label_node(self, curr_layer, i, j):
-        h = [((i, j, curr_layer), 0)]  # FIFO queue for breadth-first search
-
-        # While there are still grid squares to label ('E' hasn't been found)
-        while h:
-            # Pop front of queue
-            # item = ((i, j, layer), idx)
-            item = h[0]
-            h = h[1:]
-            i = item[0][0]
-            j = item[0][1]
-            curr_layer = item[0][2]
-            grid = self.grids[curr_layer]
-            elem = grid[j][i]
-
-            if elem == 'E':  # found endpoint (and therefore shortest path), no need to continue searching
-                return
-            elif elem == 'O' or elem and elem != 'S':  # Cannot label obstructed or already labeled grid squares
+        """Single-source wrapper around the batched BFS labeling sweep"""
+        self.label_nodes([(i, j, curr_layer)])
+
+    def label_nodes(self, sources):
+        """
+        Performs a level-synchronous BFS seeded with all provided (i, j, layer) cells at once, labeling
+        each reachable grid square with its distance from the nearest source. Fusing all sources into a
+        single sweep touches each grid square at most once regardless of the number of sources, and the
+        per-level frontier list avoids carrying a distance in every queue entry. Frontier entries are
+        packed into single ints held in typed arrays to keep the queue allocation-free and cache-resident
+        """
+        layer_idx = self._layer_idx
+        idx_layer = self._idx_layer
+        seed_dir = PACK_DIR_NONE << PACK_DIR_SHIFT
+        frontier = array.array('q', (seed_dir | (layer_idx[layer] << PACK_LAYER_SHIFT) | (j << PACK_J_SHIFT) | i
+                                     for i, j, layer in sources))
+        label = 0
+        flat_grids = self._flat_grids
+        stride = self._stride
+
+        # While there are still grid squares to label (the endpoint hasn't been found)
+        while len(frontier):
+            # Large levels are expanded with vectorized numpy ops; small ones scalar
+            if len(frontier) > NP_FRONTIER_THRESHOLD:
+                frontier, found_end = self._expand_level_np(np.asarray(frontier, dtype=np.int64), label)
+                if found_end:
+                    return
+                label += 1
                 continue
-            elif not elem:  # Label unlabeled square
-                grid[j][i] = item[1]
 
-            # Add all of this grid square's unlabeled neighbors to queue with an incremented idx
-            for neighbor in self.get_neighbors(curr_layer, i, j):
-                if not self.grids[neighbor[2]][neighbor[1]][neighbor[0]] or self.grids[neighbor[2]][neighbor[1]][neighbor[0]] == 'E':
-                    h.append((neighbor, item[1] + 1))
+            next_frontier = array.array('q')
+            push = next_frontier.append
+            for entry in frontier:
+                i = entry & PACK_COORD_MASK
+                j = (entry >> PACK_J_SHIFT) & PACK_COORD_MASK
+                curr_layer = idx_layer[(entry >> PACK_LAYER_SHIFT) & PACK_LAYER_MASK]
+                from_dir = entry >> PACK_DIR_SHIFT
+                flat = flat_grids[curr_layer]
+                elem = flat[j * stride + i]
+
+                if elem & GRID_END:  # found endpoint (and therefore shortest path), no need to continue searching
+                    return
+                elif elem & (GRID_OBS | GRID_LABEL_MASK):  # Cannot label obstructed or already labeled grid squares
+                    continue
+                elif elem == GRID_EMPTY:  # Label unlabeled square
+                    flat[j * stride + i] = label
+
+                # Add this grid square's unlabeled same-layer neighbors to the next BFS level.
+                # The cell we arrived from is already labeled, so its direction is skipped
+                # without re-reading it
+                rev = from_dir ^ 1 if from_dir < 4 else -1
+                gridX, gridY = self.dims[curr_layer]
+                layer_base = layer_idx[curr_layer] << PACK_LAYER_SHIFT
+                for d, di, dj in self._layer_steps[curr_layer]:
+                    if d == rev:
+                        continue
+                    ni = i + di
+                    nj = j + dj
+                    if 0 <= ni < gridX and 0 <= nj < gridY \
+                            and not flat[nj * stride + ni] & GRID_BLOCKED:
+                        push((d << PACK_DIR_SHIFT) | layer_base | (nj << PACK_J_SHIFT) | ni)
+
+                # Add unlabeled neighbors on adjacent routing layers; terminal layers
+                # of the routing stack skip this branch entirely
+                if self._has_interlayer[curr_layer]:
+                    for l in self._layer_neighbors[curr_layer]:
+                        if self._adj_valid_i[(curr_layer, l)][i] and self._adj_valid_j[(curr_layer, l)][j]:
+                            i2 = self._adj_i[(curr_layer, l)][i]
+                            j2 = self._adj_j[(curr_layer, l)][j]
+                            if not flat_grids[l][j2 * stride + i2] & GRID_BLOCKED:
+                                push(seed_dir | (layer_idx[l] << PACK_LAYER_SHIFT) | (j2 << PACK_J_SHIFT) | i2)
+            frontier = next_frontier
+            label += 1
+
+    def _expand_level_np(self, codes, label):
+        """
+        Vectorized equivalent of one scalar BFS level in label_nodes. Decodes the packed frontier
+        entries into coordinate arrays, labels all empty cells of the level in one gather/scatter per
+        layer, and computes the next level's entries with masked array ops instead of per-cell Python.
 
-    def get_neighbors(self, layer, i, j):
-        """Find all of a grid square's neighbor grid squares"""
-        grid = self.grids[layer]
+        Returns
+        -------
+        (next_codes, found_end) : Tuple[np.ndarray, bool]
+            The packed entries for the next BFS level and whether the endpoint was reached
+        """
+        I = codes & PACK_COORD_MASK
+        J = (codes >> PACK_J_SHIFT) & PACK_COORD_MASK
+        L = (codes >> PACK_LAYER_SHIFT) & PACK_LAYER_MASK
+        D = codes >> PACK_DIR_SHIFT
+
+        found_end = False
+        out = []
+        seed_dir = PACK_DIR_NONE << PACK_DIR_SHIFT
+
+        for lidx, layer in enumerate(self._idx_layer):
+            sel = L == lidx
+            if not sel.any():
+                continue
+            Il = I[sel]
+            Jl = J[sel]
+            Dl = D[sel]
+
+            # Reorder very large levels along the Z-order curve so the gathers and
+            # scatters below walk the grid with spatial locality. The level's label
+            # and the np.unique on the output make the order itself irrelevant
+            if Il.shape[0] > MORTON_SORT_THRESHOLD:
+                order = np.argsort(_morton_codes(Il, Jl))
+                Il = Il[order]
+                Jl = Jl[order]
+                Dl = Dl[order]
+
+            arr = self.grids[layer]
+            elem = arr[Jl, Il]
+
+            # Label every unlabeled cell of this level in a single scatter write
+            empty = elem == GRID_EMPTY
+            arr[Jl[empty], Il[empty]] = label
+
+            if (elem & GRID_END).any():
+                found_end = True
+            if found_end:
+                # The caller stops after this level, so skip computing the next one
+                continue
 
-        all_layers = tech_info['metal_tech']['routing']
-        layer_idx = [i for i in range(len(all_layers)) if all_layers[i] == layer][0]
-        neighboring_layers = []
-        if layer_idx + 1 < len(all_layers):
-            neighboring_layers.append(all_layers[layer_idx + 1])
-        if layer_idx - 1 >= 0:
-            neighboring_layers.append(all_layers[layer_idx - 1])
+            # Cells that may expand: not obstructed and not labeled before this level
+            expand = (elem & (GRID_OBS | GRID_LABEL_MASK)) == 0
+            gridX, gridY = self.dims[layer]
+            layer_base = lidx << PACK_LAYER_SHIFT
+
+            # Same-layer steps allowed by this layer's routing direction
+            for d, di, dj in self._layer_steps[layer]:
+                m = expand & (Dl != (d ^ 1))  # skip the direction each entry arrived from
+                In = Il[m] + di
+                Jn = Jl[m] + dj
+                inb = (In >= 0) & (In < gridX) & (Jn >= 0) & (Jn < gridY)
+                In = In[inb]
+                Jn = Jn[inb]
+                ok = (arr[Jn, In] & GRID_BLOCKED) == 0
+                In = In[ok]
+                Jn = Jn[ok]
+                out.append((d << PACK_DIR_SHIFT) | layer_base | (Jn << PACK_J_SHIFT) | In)
+
+            # Inter-layer candidates through the adjacency lookup tables; skipped
+            # outright on terminal layers of the routing stack
+            if self._has_interlayer[layer]:
+                Ie = Il[expand]
+                Je = Jl[expand]
+                for l in self._layer_neighbors[layer]:
+                    inb = self._adj_valid_i_arr[(layer, l)][Ie] & self._adj_valid_j_arr[(layer, l)][Je]
+                    In = self._adj_i_arr[(layer, l)][Ie[inb]]
+                    Jn = self._adj_j_arr[(layer, l)][Je[inb]]
+                    ok = (self.grids[l][Jn, In] & GRID_BLOCKED) == 0
+                    In = In[ok]
+                    Jn = Jn[ok]
+                    out.append(seed_dir | (self._layer_idx[l] << PACK_LAYER_SHIFT) | (Jn << PACK_J_SHIFT) | In)
+
+        if found_end or not out:
+            return np.empty(0, dtype=np.int64), found_end
+
+        # Deduplicate pushes: within a level all duplicates receive the same label anyway
+        return np.unique(np.concatenate(out)), found_end
 
-        neighboring_layers = [l for l in neighboring_layers if l in self.routing_layers]
+    def get_neighbors(self, layer, i, j):
+        """Find all of a grid square's neighbor grid squares"""
+        neighboring_layers = self._layer_neighbors[layer]
 
         neighbors = []
-        gridY = len(grid)
-        gridX = len(grid[0])
+        gridX, gridY = self.dims[layer]
 
-        direction = self.config[layer]['direction']
+        direction = self._direction_code[layer]
 
         # If horizontal layer, there are only horizontal neighbors
-        if direction == 'x' or direction == 'xy':
+        if direction != 1:  # 'x' or 'xy'
             if i + 1 < gridX:
                 neighbors.append((i + 1, j, layer))
             if i - 1 >= 0:
                 neighbors.append((i - 1, j, layer))
 
         # If vertical layer, there are only vertical neighbors
-        if direction == 'y' or direction == 'xy':
+        if direction != 0:  # 'y' or 'xy'
             if j + 1 < gridY:
                 neighbors.append((i, j + 1, layer))
             if j - 1 >= 0:
                 neighbors.append((i, j - 1, layer))
 
         # Find all neighboring grid squares on neighboring layers
-        for l in neighboring_layers:
-            if l != layer:
-                i2, j2 = self.find_adjacent(layer, l, i, j)
-                if i2 < self.dims[l][0] and j2 < self.dims[l][1]:
-                    neighbors.append((i2, j2, l))
+        if self._has_interlayer[layer]:
+            for l in neighboring_layers:
+                if self._adj_valid_i[(layer, l)][i] and self._adj_valid_j[(layer, l)][j]:
+                    neighbors.append((self._adj_i[(layer, l)][i], self._adj_j[(layer, l)][j], l))
 
         return neighbors
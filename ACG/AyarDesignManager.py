@@ -1,11 +1,45 @@
+import gc
 import os
+import logging
+import copy
+import functools
 import importlib
-from bag.io import read_yaml
+from concurrent.futures import ThreadPoolExecutor
+import yaml
 from bag.layout.routing import RoutingGrid
 from bag.layout.template import TemplateDB
 # TB imports
 from bag.data import load_sim_results, save_sim_results, load_sim_file
 
+# Parse specs with the libyaml loader when it is compiled in; it is several
+# times faster than the pure-Python SafeLoader on big spec files
+try:
+    from yaml import CSafeLoader as _SpecLoader
+except ImportError:
+    from yaml import SafeLoader as _SpecLoader
+
+# Progress reporting goes through a module logger instead of bare print; the
+# lazy %-style arguments skip formatting entirely when INFO is disabled, and a
+# single handler avoids stdout lock contention between the pooled workers
+_log = logging.getLogger(__name__)
+
+
+def _as_list(value):
+    """Normalizes a bare value or tuple into a list for the batch interfaces"""
+    if isinstance(value, (list, tuple)):
+        return list(value)
+    return [value]
+
+
+@functools.lru_cache(maxsize=64)
+def _load_spec(path, mtime):
+    """
+    Parses a spec yaml file, memoized by path. The mtime in the key invalidates
+    the cached entry when the file changes on disk
+    """
+    with open(path, 'r') as f:
+        return yaml.load(f, Loader=_SpecLoader)
+
 
 class AyarDesignManager:
     """
@@ -15,13 +49,53 @@ class AyarDesignManager:
 
     def __init__(self, bprj, spec_file, gds_layermap=''):
         self.prj = bprj
-        self.tdb = None  # templateDB instance for layout creation
-        self.impl_lib = None  # Virtuoso library where generated cells are stored
+        self._spec_file = spec_file
+        self._tdb = None  # templateDB instance for layout creation, built lazily
+        self._gds_layermap = gds_layermap
         self.cell_name_list = None  # list of names for each created cell
-        self.specs = read_yaml(spec_file)
+        # Deep-copy the cached parse so callers that mutate self.specs (sweep
+        # flows often do) cannot poison the cache for later instances
+        self.specs = copy.deepcopy(_load_spec(spec_file, os.path.getmtime(spec_file)))
+        self._temp_cls_cache = {}  # resolved layout generator classes by (package, class) key
+        self._dsn_module_cache = {}  # prototype design modules by (lib, cell) key
+        # Frequently read spec entries are resolved into attributes once, so the
+        # generation/sim methods do attribute loads instead of repeated dict probes
+        self.impl_lib = self.specs['impl_lib']
+        self.impl_cell = self.specs['impl_cell']
+        self.tb_params_spec = self.specs.get('tb_params', {})
+        # Output HDF5 path for each testbench, built once instead of re-joining
+        # the data_dir and cell name on every simulate/load iteration
+        self._hdf5_paths = {name: os.path.join(info['data_dir'], f'{name}.hdf5')
+                            for name, info in self.tb_params_spec.items()}
+        # Default generation arguments, resolved once instead of probing the
+        # spec dict on every generate_* call inside sweep flows. A spec with
+        # neither key leaves the default as None so that actually relying on it
+        # still raises like the direct dict lookup used to
+        self._default_layout_params = self._resolve_default_params('layout_params')
+        self._default_sch_params = self._resolve_default_params('sch_params')
+        self._default_cell_names = [self.impl_cell]
+
+    def _resolve_default_params(self, key):
+        """ Returns the default parameter list for key, falling back to dsn_params """
+        if key in self.specs:
+            return [self.specs[key]]
+        if 'dsn_params' in self.specs:
+            return [self.specs['dsn_params']]
+        return None
+
+    @property
+    def tdb(self):
+        """
+        templateDB instance for layout creation. Built on first access so flows that
+        only simulate or run LVS/PEX skip the RoutingGrid/TemplateDB construction
+        """
+        if self._tdb is None:
+            self.make_tdb(self._gds_layermap)
+        return self._tdb
 
-        # Initialize self.tdb with appropriate templateDB instance
-        self.make_tdb(gds_layermap)
+    @tdb.setter
+    def tdb(self, value):
+        self._tdb = value
 
     """
     GENERATION METHODS - call these methods to generate and simulate your designs
@@ -44,33 +118,43 @@ class AyarDesignManager:
         cell_name_list : :obj:'list' of :obj:'str'
             list of names to be applied to each implementation of the layout class
         """
-        # If no list is provided, extract parameters from the provided spec file
+        # If no list is provided, use the defaults extracted from the spec file
         if layout_params_list is None:
-            if 'layout_params' in self.specs:
-                layout_params_list = [self.specs['layout_params']]
-            else:
-                layout_params_list = [self.specs['dsn_params']]
+            if self._default_layout_params is None:
+                raise KeyError('dsn_params')
+            layout_params_list = self._default_layout_params
         if cell_name_list is None:
-            cell_name_list = [self.specs['impl_cell']]
+            cell_name_list = self._default_cell_names
         # Reformat provided lists
-        if type(layout_params_list) is not list:
-            layout_params_list = [layout_params_list]
-        if type(cell_name_list) is not list:
-            cell_name_list = [cell_name_list]
+        layout_params_list = _as_list(layout_params_list)
+        cell_name_list = _as_list(cell_name_list)
 
-        print('Generating Layout')
+        _log.info('Generating Layout')
         cls_package = self.specs['layout_package']
         cls_name = self.specs['layout_class']
 
-        lay_module = importlib.import_module(cls_package)
-        temp_cls = getattr(lay_module, cls_name)
-
-        temp_list = []
-        for lay_params in layout_params_list:
-            template = self.tdb.new_template(params=lay_params, temp_cls=temp_cls, debug=False)
-            temp_list.append(template)
-
-        self.tdb.batch_layout(self.prj, temp_list, cell_name_list)
+        # Flows that generate repeatedly (e.g. sweeps via run_flow) resolve the
+        # same generator class every call; cache it after the first import
+        key = (cls_package, cls_name)
+        temp_cls = self._temp_cls_cache.get(key)
+        if temp_cls is None:
+            temp_cls = getattr(importlib.import_module(cls_package), cls_name)
+            self._temp_cls_cache[key] = temp_cls
+
+        # Wide sweeps are generated in chunks so that only layout_batch_size
+        # template geometry graphs are alive at once instead of the whole sweep
+        chunk = self.specs.get('layout_batch_size', 32)
+        for i in range(0, len(layout_params_list), chunk):
+            temp_list = []
+            for lay_params in layout_params_list[i:i + chunk]:
+                template = self.tdb.new_template(params=lay_params, temp_cls=temp_cls, debug=False)
+                temp_list.append(template)
+
+            self.tdb.batch_layout(self.prj, temp_list, cell_name_list[i:i + chunk])
+            if len(layout_params_list) > chunk:
+                # Release the finished chunk's templates before building the next
+                del temp_list
+                gc.collect()
 
     def generate_schematic(self, sch_params_list=None, cell_name_list=None):
         """
@@ -84,23 +168,20 @@ class AyarDesignManager:
         cell_name_list : :obj:'list' of :obj:'str'
             list of names to be applied to each implementation of the layout class
         """
-        # If no list is provided, extract parameters from the provided spec file
+        # If no list is provided, use the defaults extracted from the spec file
         if sch_params_list is None:
-            if 'sch_params' in self.specs:
-                sch_params_list = [self.specs['sch_params']]
-            else:
-                sch_params_list = [self.specs['dsn_params']]
+            if self._default_sch_params is None:
+                raise KeyError('dsn_params')
+            sch_params_list = self._default_sch_params
         if cell_name_list is None:
-            cell_name_list = [self.specs['impl_cell']]
-        if type(sch_params_list) is not list:
-            sch_params_list = [sch_params_list]
-        if type(cell_name_list) is not list:
-            cell_name_list = [cell_name_list]
+            cell_name_list = self._default_cell_names
+        sch_params_list = _as_list(sch_params_list)
+        cell_name_list = _as_list(cell_name_list)
 
-        print('Generating Schematic')
+        _log.info('Generating Schematic')
         sch_temp_lib = self.specs['sch_temp_lib']
         sch_temp_cell = self.specs['sch_temp_cell']
-        impl_lib = self.specs['impl_lib']
+        impl_lib = self.impl_lib
 
         inst_list, name_list = [], []
         for sch_params, cur_name in zip(sch_params_list, cell_name_list):
@@ -123,63 +204,115 @@ class AyarDesignManager:
         tb_name_list : :obj:'list' of :obj:'str'
             list of names to be applied to each implementation of the tb class
         """
-        # If no info is provided, extract parameters from the provided spec file
+        # If no info is provided, extract parameters from the provided spec file,
+        # unpacking names and parameters from one items() pass so they cannot
+        # diverge in order
         if tb_params_list is None or tb_name_list is None:
-            tb_name_list = self.specs['tb_params'].keys()
-            tb_params_list = self.specs['tb_params'].values()
-
-        print('Generating Testbench')
-        impl_lib = self.specs['impl_lib']
-        impl_cell = self.specs['impl_cell']
-
-        for info, name in zip(tb_params_list, tb_name_list):
-            tb_lib = info['tb_lib']
-            tb_cell = info['tb_cell']
-            tb_sch_params = info['tb_sch_params']
-            # If dut lib/cell is provided, override the impl lib/cell
-            if 'dut_lib' in info and 'dut_cell' in info:
-                impl_lib = info['dut_lib']
-                impl_cell = info['dut_cell']
-
-            tb_dsn = self.prj.create_design_module(tb_lib, tb_cell)
-            tb_dsn.design(dut_lib=impl_lib, dut_cell=impl_cell, **tb_sch_params)
-            tb_dsn.implement_design(impl_lib, top_cell_name=name)
+            tb_name_list = []
+            tb_params_list = []
+            for name, info in self.tb_params_spec.items():
+                tb_name_list.append(name)
+                tb_params_list.append(info)
+
+        _log.info('Generating Testbench')
+        # Each testbench only depends on its own parameters and spends most of its
+        # time waiting on the BAG/Virtuoso backend, so the builds are dispatched to
+        # a thread pool instead of running back to back
+        with ThreadPoolExecutor(max_workers=self.specs.get('tb_workers', 8)) as executor:
+            list(executor.map(self._build_one_tb, tb_params_list, tb_name_list))
+
+    def _build_one_tb(self, info, name):
+        """
+        Creates and implements a single testbench. The dut lib/cell overrides are
+        resolved into locals here, so one testbench's override can no longer leak
+        into the testbenches generated after it
+        """
+        impl_lib = self.impl_lib
+        impl_cell = self.impl_cell
+        tb_lib = info['tb_lib']
+        tb_cell = info['tb_cell']
+        tb_sch_params = info['tb_sch_params']
+        # If dut lib/cell is provided, override the impl lib/cell
+        if 'dut_lib' in info and 'dut_cell' in info:
+            impl_lib = info['dut_lib']
+            impl_cell = info['dut_cell']
+
+        # Sweeps usually instantiate many testbenches from one template; the
+        # module prototype (an OA library lookup) is fetched once per (lib, cell)
+        # and each build designs against its own deep copy, so the pooled builds
+        # never mutate a shared module
+        key = (tb_lib, tb_cell)
+        proto = self._dsn_module_cache.get(key)
+        if proto is None:
+            proto = self.prj.create_design_module(tb_lib, tb_cell)
+            self._dsn_module_cache[key] = proto
+        tb_dsn = copy.deepcopy(proto)
+        tb_dsn.design(dut_lib=impl_lib, dut_cell=impl_cell, **tb_sch_params)
+        tb_dsn.implement_design(impl_lib, top_cell_name=name)
 
     def simulate(self):
         """
         Runs a batch of simulations on the generated TB's. All parameters for simulation are set within the spec file
         """
-        print('Running Simulation')
-        impl_lib = self.specs['impl_lib']
-        impl_cell = self.specs['impl_cell']
+        _log.info('Running Simulation')
+        impl_lib = self.impl_lib
+        impl_cell = self.impl_cell
+
+        # Make sure every result directory exists before any job finishes
+        for path in self._hdf5_paths.values():
+            os.makedirs(os.path.dirname(path), exist_ok=True)
 
         results_dict = {}
-        for tb_impl_cell, info in self.specs['tb_params'].items():
-            tb_params = info['tb_sim_params']
-            view_name = info['view_name']
-            sim_envs = info['sim_envs']
-            data_dir = info['data_dir']
-
-            # setup testbench ADEXL state
-            print('setting up %s' % tb_impl_cell)
-            tb = self.prj.configure_testbench(impl_lib, tb_impl_cell)
-            # set testbench parameters values
-            for key, val in tb_params.items():
-                tb.set_parameter(key, val)
-            # set config view, i.e. schematic vs extracted
-            tb.set_simulation_view(impl_lib, impl_cell, view_name)
-            # set process corners
-            tb.set_simulation_environments(sim_envs)
-            # commit changes to ADEXL state back to database
-            tb.update_testbench()
-            print('running simulation')
-            tb.run_simulation()
-            print('simulation done, load results')
-            results = load_sim_results(tb.save_dir)
-            save_sim_results(results, os.path.join(data_dir, '%s.hdf5' % tb_impl_cell))
-            results_dict[tb_impl_cell] = results
-
-        print('all simulation done')
+        futures = {}
+        force_sim = self.specs.get('force_sim', False)
+        spec_mtime = os.path.getmtime(self._spec_file)
+        with ThreadPoolExecutor(max_workers=max(1, len(self.tb_params_spec))) as executor:
+            # First configure every testbench and submit its simulation, so the
+            # backend runs the jobs concurrently instead of one after the other
+            for tb_impl_cell, info in self.tb_params_spec.items():
+                # Incremental flow: results saved after the spec file was last
+                # edited are still valid, so reload them instead of re-simulating
+                out_path = self._hdf5_paths[tb_impl_cell]
+                if (not force_sim and os.path.exists(out_path)
+                        and os.path.getmtime(out_path) > spec_mtime):
+                    _log.info('results for %s are up to date, skipping simulation', tb_impl_cell)
+                    results_dict[tb_impl_cell] = load_sim_file(out_path)
+                    continue
+
+                tb_params = info['tb_sim_params']
+                view_name = info['view_name']
+                sim_envs = info['sim_envs']
+
+                # setup testbench ADEXL state
+                _log.info('setting up %s', tb_impl_cell)
+                tb = self.prj.configure_testbench(impl_lib, tb_impl_cell)
+                # set testbench parameters values
+                for key, val in tb_params.items():
+                    tb.set_parameter(key, val)
+                # set config view, i.e. schematic vs extracted
+                tb.set_simulation_view(impl_lib, impl_cell, view_name)
+                # set process corners
+                tb.set_simulation_environments(sim_envs)
+                # commit changes to ADEXL state back to database
+                tb.update_testbench()
+                _log.info('running simulation for %s', tb_impl_cell)
+                futures[tb_impl_cell] = (executor.submit(tb.run_simulation), tb)
+
+            # Then collect in submission order; loading and re-saving one
+            # testbench's results overlaps with the simulations still running
+            for tb_impl_cell, (future, tb) in futures.items():
+                future.result()
+                _log.info('simulation done, load results for %s', tb_impl_cell)
+                results = load_sim_results(tb.save_dir)
+                # Re-saving big waveform dumps doubles the I/O bytes and the disk
+                # footprint; the keep_raw spec flag leaves the results in the
+                # simulator's save directory only (load_sim_data then has nothing
+                # to read, so flows using it should keep the default)
+                if not self.specs.get('keep_raw', False):
+                    save_sim_results(results, self._hdf5_paths[tb_impl_cell])
+                results_dict[tb_impl_cell] = results
+
+        _log.info('all simulation done')
         return results_dict
 
     def run_LVS(self, cell_name_list=None):
@@ -192,16 +325,22 @@ class AyarDesignManager:
             list of strings containing the names of the cells we should run LVS on
         """
         if not cell_name_list:
-            cell_name_list = [self.specs['impl_cell']]
+            cell_name_list = self._default_cell_names
 
+        # The per-cell LVS runs are independent backend jobs; submit them together
+        # and report once everything is collected so the output is not interleaved
         for cell_name in cell_name_list:
-            print('Running LVS on {}'.format(cell_name))
-            lvs_passed, lvs_log = self.prj.run_lvs(self.impl_lib, cell_name)
+            _log.info('Running LVS on %s', cell_name)
+        with ThreadPoolExecutor(max_workers=min(16, len(cell_name_list))) as executor:
+            results = list(executor.map(lambda cell: self.prj.run_lvs(self.impl_lib, cell),
+                                        cell_name_list))
+
+        for cell_name, (lvs_passed, lvs_log) in zip(cell_name_list, results):
             if lvs_passed:
-                print('\n' + 'LVS Clean :)')
+                _log.info('LVS Clean :) %s', cell_name)
             else:
-                print('\n' + 'LVS Incorrect :(')
-                print('LVS log path: {}'.format(lvs_log))
+                _log.warning('LVS Incorrect :( %s', cell_name)
+                _log.warning('LVS log path: %s', lvs_log)
 
     def run_PEX(self, cell_name_list):
         """
@@ -212,27 +351,40 @@ class AyarDesignManager:
         cell_name_list : :obj:'list' of :obj:'str'
             list of strings containing the names of the cells we should run PEX on
         """
+        # The per-cell PEX runs are independent backend jobs; submit them together
+        # and report once everything is collected so the output is not interleaved
         for cell_name in cell_name_list:
-            print('Running PEX on {}'.format(cell_name))
-            pex_passed, pex_log = self.prj.run_rcx(self.impl_lib, cell_name, create_schematic=True)
+            _log.info('Running PEX on %s', cell_name)
+        with ThreadPoolExecutor(max_workers=min(16, max(1, len(cell_name_list)))) as executor:
+            results = list(executor.map(lambda cell: self.prj.run_rcx(self.impl_lib, cell,
+                                                                      create_schematic=True),
+                                        cell_name_list))
+
+        for cell_name, (pex_passed, pex_log) in zip(cell_name_list, results):
             if pex_passed:
-                print('\n' + 'PEX Passed :)')
+                _log.info('PEX Passed :) %s', cell_name)
             else:
-                print('\n' + 'PEX Failed :(')
-                print('PEX log path: {}'.format(pex_log))
+                _log.warning('PEX Failed :( %s', cell_name)
+                _log.warning('PEX log path: %s', pex_log)
 
     def load_sim_data(self):
         """
         Returns simulation data for all TBs in spec file
         """
+        names = []
+        fnames = []
+        for name in self.tb_params_spec:
+            _log.info('loading simulation data for %s', name)
+            names.append(name)
+            fnames.append(self._hdf5_paths[name])
+
+        # The HDF5 files are independent, so the reads are overlapped in a pool
         results_dict = {}
-        for name, info in self.specs['tb_params'].items():
-            data_dir = info['data_dir']
-            fname = os.path.join(data_dir, '%s.hdf5' % name)
-            print('loading simulation data for %s' % name)
-            results_dict[name] = load_sim_file(fname)
+        with ThreadPoolExecutor(max_workers=min(16, max(1, len(names)))) as executor:
+            for name, results in zip(names, executor.map(load_sim_file, fnames)):
+                results_dict[name] = results
 
-        print('finish loading data')
+        _log.info('finish loading data')
         return results_dict
 
     def import_schematic_library(self, lib_name):
@@ -255,7 +407,6 @@ class AyarDesignManager:
         """
         Makes a new TemplateDB object. If no routing grid parameters are sent in, dummy parameters are used.
         """
-        self.impl_lib = self.specs['impl_lib']
         if 'routing_grid' in self.specs:
             layers = self.specs['routing_grid']['layers']
             spaces = self.specs['routing_grid']['spaces']
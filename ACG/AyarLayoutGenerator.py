@@ -6,14 +6,27 @@ to describe layout generation scripts in the Python language and automate the la
 # General imports
 import abc
 from typing import Union, Tuple, List, Optional
-import re
 import yaml
 import os
+import numpy as np
 
 # BAG imports
 import bag
 from bag.layout.template import TemplateBase
 
+# Optional imports
+try:
+    from rtree import index as rtree_index
+except ImportError:
+    rtree_index = None
+
+# Parse layout yaml with the libyaml loader when it is compiled in; it is
+# several times faster than the pure-Python loader on big imported cells
+try:
+    from yaml import CSafeLoader as _YamlLoader
+except ImportError:
+    from yaml import SafeLoader as _YamlLoader
+
 # ACG imports
 from ACG.Rectangle import Rectangle
 from ACG.Track import Track, TrackManager
@@ -22,6 +35,11 @@ from ACG.Via import ViaStack, Via
 from ACG import tech as tech_info
 from ACG.LayoutParse import CadenceLayoutParser
 
+# Rect count below which overlap queries scan the rect list directly instead of
+# consulting an R-tree; building/maintaining the index costs more than it saves
+# on small databases
+RTREE_THRESHOLD = 32
+
 
 class AyarLayoutGenerator(TemplateBase, metaclass=abc.ABCMeta):
     """
@@ -43,6 +61,10 @@ class AyarLayoutGenerator(TemplateBase, metaclass=abc.ABCMeta):
             'template': []
         }
 
+        # Lazily built spatial index over self._db['rect'] for query_overlapping
+        self._rect_index = None
+        self._rect_index_size = 0
+
         # Create an empty database that will store only the relevant layout objects
         self.loc = {}
 
@@ -142,8 +164,9 @@ class AyarLayoutGenerator(TemplateBase, metaclass=abc.ABCMeta):
             xy = [[0, 0], [default_w, default_w]]
 
         # Otherwise just directly create the rectangle according to the users specification
-        self._db['rect'].append(Rectangle(xy, layer=layer, virtual=virtual))
-        return self._db['rect'][-1]
+        temp = Rectangle(xy, layer=layer, virtual=virtual)
+        self._db['rect'].append(temp)
+        return temp
 
     def copy_rect(self,
                   rect: Rectangle,
@@ -169,7 +192,51 @@ class AyarLayoutGenerator(TemplateBase, metaclass=abc.ABCMeta):
         """
         temp = rect.copy(layer=layer, virtual=virtual)
         self._db['rect'].append(temp)
-        return self._db['rect'][-1]
+        return temp
+
+    def query_overlapping(self,
+                          bounds: Tuple[float, float, float, float]
+                          ) -> List[Rectangle]:
+        """
+        Returns the rectangles in the local db whose bounding box overlaps the given
+        window, using the same strict overlap semantics as Rectangle.overlap
+
+        Small databases are scanned directly. Past RTREE_THRESHOLD rects, if the
+        optional rtree package is installed, an R-tree over the current rect list is
+        built and reused until the rect count changes, so each query only inspects
+        envelope candidates instead of every rect. The index is rebuilt from scratch
+        on growth because rects may be reshaped in place after creation; callers
+        should query once the geometry has settled
+
+        Parameters
+        ----------
+        bounds : Tuple[float, float, float, float]
+            (ll_x, ll_y, ur_x, ur_y) coordinates of the query window
+
+        Returns
+        -------
+        rect_list : List[Rectangle]
+            the rectangles overlapping the query window
+        """
+        rect_list = self._db['rect']
+        ll_x, ll_y, ur_x, ur_y = bounds
+
+        if rtree_index is None or len(rect_list) < RTREE_THRESHOLD:
+            return [r for r in rect_list
+                    if r.ll.x < ur_x and ll_x < r.ur.x and r.ll.y < ur_y and ll_y < r.ur.y]
+
+        if self._rect_index is None or self._rect_index_size != len(rect_list):
+            idx = rtree_index.Index()
+            for i, r in enumerate(rect_list):
+                idx.insert(i, (r.ll.x, r.ll.y, r.ur.x, r.ur.y))
+            self._rect_index = idx
+            self._rect_index_size = len(rect_list)
+
+        # The R-tree prunes to envelope candidates; re-test each candidate so that
+        # edge-touching rects are excluded like in the brute-force path
+        candidates = [rect_list[i] for i in self._rect_index.intersection(bounds)]
+        return [r for r in candidates
+                if r.ll.x < ur_x and ll_x < r.ur.x and r.ll.y < ur_y and ll_y < r.ur.y]
 
     def add_track(self, name: str, dim: str, spacing: float, origin: float = 0) -> Track:
         """
@@ -222,8 +289,10 @@ class AyarLayoutGenerator(TemplateBase, metaclass=abc.ABCMeta):
                      orient="R0",
                      ) -> VirtualInst:
         """ Adds a single instance from a provided template master """
-        temp = VirtualInst(master, inst_name=inst_name)
-        temp.shift_origin(loc, orient=orient)  # Move virtual instance to desired location/orientation
+        # Constructing at the final location/orientation runs the recursive
+        # export_locations shift once; building at the origin and then calling
+        # shift_origin walked the master's whole location dict twice
+        temp = VirtualInst(master, origin=loc, orient=orient, inst_name=inst_name)
         self._db['instance'].append(temp)  # Add the instance to the list
         return temp
 
@@ -290,7 +359,7 @@ class AyarLayoutGenerator(TemplateBase, metaclass=abc.ABCMeta):
 
         # Grab the raw layout data, then delete the temp file afterward
         with open(temp_file_name, 'r') as f:
-            data = yaml.load(f)
+            data = yaml.load(f, Loader=_YamlLoader)
         os.remove(temp_file_name)
 
         # Create the new master
@@ -379,6 +448,10 @@ class AyarLayoutGenerator(TemplateBase, metaclass=abc.ABCMeta):
 
     def _commit_shapes(self) -> None:
         """ Takes all shapes in local db and creates standard BAG equivalents """
+        # One fused boundary reduction over rects and instance bounds, then the
+        # emit loops; same result as growing the boundary per shape category but
+        # a single pass over the combined corner array
+        self._boundary_union(self._db['rect'] + self._inst_boundaries())
         self._commit_rect()
         self._commit_inst()
         self._commit_via()
@@ -390,23 +463,59 @@ class AyarLayoutGenerator(TemplateBase, metaclass=abc.ABCMeta):
         # for layer_num in range(1, self.prim_top_layer + 1):
         #     self.mark_bbox_used(layer_num, self.prim_bound_box)
 
+    def _boundary_union(self, bounds: List[Rectangle]) -> None:
+        """
+        Grows temp_boundary to enclose every rectangle in bounds. Equivalent to
+        chaining get_enclosure over the list, but the corner reduction is done
+        with two vectorized min/max calls and the highest-layer propagation is
+        folded in one pass, instead of allocating an intermediate Rectangle per
+        shape
+        """
+        if not bounds:
+            return
+        arr = np.empty((len(bounds) + 1, 4), dtype=np.float64)
+        boundary = self.temp_boundary
+        arr[0] = (boundary.ll.x, boundary.ll.y, boundary.ur.x, boundary.ur.y)
+        for i, rect in enumerate(bounds, 1):
+            arr[i] = (rect.ll.x, rect.ll.y, rect.ur.x, rect.ur.y)
+        ll = arr[:, :2].min(0)
+        ur = arr[:, 2:].max(0)
+
+        # Track the highest routing layer like get_enclosure does, with ties and
+        # non-routing layers resolving in favor of the earlier rectangle
+        layerstack = tech_info.tech_info['metal_tech']['layerstack']
+        best_lpp = boundary.lpp
+        best_idx = layerstack.index(boundary.layer) if boundary.layer in layerstack else None
+        for rect in bounds:
+            if rect.layer in layerstack:
+                idx = layerstack.index(rect.layer)
+                if best_idx is None or idx > best_idx:
+                    best_idx = idx
+                    best_lpp = rect.lpp
+
+        self.temp_boundary = Rectangle(xy=[[ll[0], ll[1]], [ur[0], ur[1]]],
+                                       layer=best_lpp, virtual=True)
+
+    def _inst_boundaries(self) -> List[Rectangle]:
+        """ Returns the transformed boundary of every instance in the db """
+        bounds = []
+        for inst in self._db['instance']:
+            try:
+                bounds.append(inst.master.temp_boundary.shift_origin(origin=inst.origin, orient=inst.orient))
+            except AttributeError:
+                # TODO: Get the size properly
+                bounds.append(Rectangle(xy=[[0, 0], [.1, .1]], layer='M1', virtual=True))
+        return bounds
+
     def _commit_rect(self) -> None:
         """ Takes in all rectangles in the db and creates standard BAG equivalents """
         for shape in self._db['rect']:
-            self.temp_boundary = self.temp_boundary.get_enclosure(shape)
             if shape.virtual is False:
                 TemplateBase.add_rect(self, shape.lpp, shape.to_bbox())
 
     def _commit_inst(self) -> None:
         """ Takes in all inst in the db and creates standard BAG equivalents """
         for inst in self._db['instance']:
-            # Get the boundary of the instance
-            try:
-                bound = inst.master.temp_boundary.shift_origin(origin=inst.origin, orient=inst.orient)
-            except AttributeError:
-                # TODO: Get the size properly
-                bound = Rectangle(xy=[[0, 0], [.1, .1]], layer='M1', virtual=True)
-            self.temp_boundary = self.temp_boundary.get_enclosure(bound)
             TemplateBase.add_instance(self,
                                       inst.master,
                                       inst_name=inst.inst_name,
@@ -480,45 +589,47 @@ class LayoutAbstract(AyarLayoutGenerator):
 
     def get_cell_params(self):
         """Read cell parameters from specific Yaml"""
-        pathname = open(self.cell_yaml, mode='r')
-        self.cell_dict = yaml.load(pathname)
+        with open(self.cell_yaml, mode='r') as f:
+            self.cell_dict = yaml.load(f, Loader=_YamlLoader)
         print("{} instantiated".format(self.params['cellname']))
 
     def get_tech_params(self):
         """Get tech information to ensure that information of metal stacks is passed through yaml and not hardcoded"""
-        self.tech_layers = tech_info.tech_info['metal_tech']['routing']
+        # frozenset turns the per-pin-layer membership checks into O(1) lookups
+        self.tech_layers = frozenset(tech_info.tech_info['metal_tech']['routing'])
 
     def calculate_pins(self):
         """Calculates the pins on the stdcell/macro and pushes them to loc dict"""
-        for keys in self.cell_dict:
-            if re.match('pins', keys):
-                for pins in self.cell_dict['pins']:
-                    pins_dict = {pins: []}
-                    for layers in self.cell_dict['pins'][pins]:
-                        if layers.upper() in self.tech_layers:
-                            for rects in self.cell_dict['pins'][pins][layers]:
-                                shape = self.add_rect(layers.upper(), rects, virtual=True)
-                                pins_dict[pins].append(shape)
-                    self.loc.update(pins_dict)
-                    self.pin_list.append(pins)
+        # The parsed yaml keys are exact strings, so the section is fetched
+        # directly instead of regex-matching every top-level key
+        pins_section = self.cell_dict.get('pins')
+        if pins_section is None:
+            return
+        for pins, layer_map in pins_section.items():
+            pins_dict = {pins: []}
+            for layers, rect_list in layer_map.items():
+                layer_upper = layers.upper()
+                if layer_upper in self.tech_layers:
+                    for rects in rect_list:
+                        shape = self.add_rect(layer_upper, rects, virtual=True)
+                        pins_dict[pins].append(shape)
+            self.loc.update(pins_dict)
+            self.pin_list.append(pins)
 
     #                    self.copy_rect(shape,layer=(layers.upper(), 'label'))
     #                    self.create_label(pins,shape)
 
     def calculate_boundary(self):
         """Calulates the boundary from lef file"""
-        for keys in self.cell_dict:
-            if re.match('size', keys):
-                bnd = self.add_rect('OUTLINE', self.cell_dict['size'], virtual=True)
-                bnd_dict = {'bnd': bnd}
-                self.loc.update(bnd_dict)
+        if 'size' in self.cell_dict:
+            bnd = self.add_rect('OUTLINE', self.cell_dict['size'], virtual=True)
+            bnd_dict = {'bnd': bnd}
+            self.loc.update(bnd_dict)
 
     def calculate_obs(self):
         """Calulates obstructions in the lef (Can be pushed to ACG/BAG ), cant see a reason for it yet"""
-        for keys in self.cell_dict:
-            if re.match('obs', keys):
-                for layers in self.cell_dict['obs']:
-                    pass
+        for layers in self.cell_dict.get('obs', ()):
+            pass
 
 
 class CadenceLayout(AyarLayoutGenerator):
@@ -11,6 +11,11 @@ class Rectangle(VirtualObj):
     Creates a better rectangle object with stretch and align capabilities
     """
 
+    # What the rectangle represents in a route network ('wire' or 'via'); routers
+    # override this per instance so filters check one attribute instead of
+    # classifying rects by their dimensions
+    kind = 'wire'
+
     """ Constructor Methods """
 
     def __init__(self, xy, layer, virtual=False):
@@ -509,9 +514,6 @@ class Rectangle(VirtualObj):
         """
         Returns whether or not two rectangles overlap in both dimensions
         """
-        x_min = max(A.ll.x, B.ll.x)
-        x_max = min(A.ur.x, B.ur.x)
-        y_min = max(A.ll.y, B.ll.y)
-        y_max = min(A.ur.y, B.ur.y)
-
-        return x_min < x_max and y_min < y_max
+        # Short-circuiting interval test; equivalent to comparing the max of the lower
+        # corners against the min of the upper corners without the four builtin calls
+        return A.ll.x < B.ur.x and B.ll.x < A.ur.x and A.ll.y < B.ur.y and B.ll.y < A.ur.y
@@ -36,12 +36,16 @@ class TrackManager:
         TrackManager
             Generated TrackManager object from the provided RoutingGrid
         """
+        # Layer names coming from the grid are unique by construction, so the
+        # track dict is built directly in one items() pass without add_track's
+        # per-name duplicate check or the repeated sp_tracks lookups
         track_manager = cls()
-        for layer_id in grid.sp_tracks:
-            name = grid.tech_info.get_layer_name(layer_id)
-            spacing = grid.sp_tracks[layer_id] * grid.resolution
-            dim = grid.dir_tracks[layer_id]
-            track_manager.add_track(name=name, dim=dim, spacing=spacing)
+        resolution = grid.resolution
+        track_manager.tracks = {
+            grid.tech_info.get_layer_name(layer_id): Track(dim=grid.dir_tracks[layer_id],
+                                                           spacing=num_tracks * resolution)
+            for layer_id, num_tracks in grid.sp_tracks.items()
+        }
         return track_manager
 
     def add_track(self, name, dim, spacing, origin=0):
@@ -81,8 +85,11 @@ class Track:
 
         # Init local property variables
         self._dim = None
+        self._dim_code = None  # 0 for x, 1 for y; branched on in the hot methods
         self._spacing = None
+        self._spacing_f = None
         self._origin = None
+        self._origin_f = None
         self._res = .001
 
         # Store provided params with property setters
@@ -104,52 +111,60 @@ class Track:
 
     @dim.setter
     def dim(self, direction):
-        if direction is 'x':
+        # == rather than is; identity of string literals is an implementation
+        # detail and breaks for runtime-built strings
+        if direction == 'x':
             self._dim = 'x'
-        elif direction is 'y':
+            self._dim_code = 0
+        elif direction == 'y':
             self._dim = 'y'
+            self._dim_code = 1
         else:
             raise ValueError('Provided direction is invalid, must be x or y')
 
     @property
     def spacing(self):
-        return self._spacing * self._res
+        return self._spacing_f
 
     @spacing.setter
     def spacing(self, value):
         temp = round(value / self._res)  # Find location of provided spacing on grid
         self._spacing = int(temp)  # Force the coordinate to be an int
+        self._spacing_f = self._spacing * self._res  # cache the float so the getter is a plain read
 
     @property
     def origin(self):
-        return self._origin * self._res
+        return self._origin_f
 
     @origin.setter
     def origin(self, value):
         temp = round(value / self._res)  # Find location of provided spacing on grid
         self._origin = int(temp)  # Force the coordinate to be an int
+        self._origin_f = self._origin * self._res  # cache the float so the getter is a plain read
 
     """ Utility Methods """
 
     def get_track(self, num) -> XY:
         """ Returns [x, y] coordinates of desired track # """
-        distance = self.spacing * num
+        # Work on the stored integer grid directly; one multiply-add and a
+        # single scale by the resolution, with no property dispatch per call
+        coord = (self._origin + self._spacing * num) * self._res
 
-        if self.dim is 'x':
-            return XY([self.origin + distance, 0])
-        elif self.dim is 'y':
-            return XY([0, self.origin + distance])
+        if self._dim_code == 0:
+            return XY([coord, 0])
+        else:
+            return XY([0, coord])
 
     def align(self, ref_rect, ref_handle, num=0, offset=0):
         """ Aligns the provided track number to handle of reference rectangle """
         ref_loc = ref_rect.loc[ref_handle]  # grab coordinates of reference location
         curr_loc = self.get_track(num)  # grab coordinates of track location
 
-        if self.dim is 'x':
+        if self._dim_code == 0:
             diff_x = curr_loc.x - ref_loc.x - offset  # calculate x dimension difference
             self.origin -= diff_x
-        elif self.dim is 'y':
-            diff_y = curr_loc.y - ref_loc.x - offset  # calculate y dimension difference
+        else:
+            diff_y = curr_loc.y - ref_loc.y - offset  # calculate y dimension difference
             self.origin -= diff_y
 
     def stretch(self, track_num, ref_rect, ref_handle, offset=0):
@@ -157,9 +172,9 @@ class Track:
         ref_loc = ref_rect[ref_handle]
         curr_loc = self.get_track(track_num)
 
-        if self.dim is 'x':
+        if self._dim_code == 0:
             diff_x = curr_loc.x - ref_loc.x - offset
             self.spacing -= diff_x
-        elif self.dim is 'y':
+        else:
             diff_y = curr_loc.y - ref_loc.y - offset
             self.spacing -= diff_y
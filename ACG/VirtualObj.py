@@ -5,6 +5,12 @@ class VirtualObj(metaclass=abc.ABCMeta):
     """
     Abstract class for creation of primitive objects
     """
+
+    # Empty slots so that subclasses may opt out of per-instance __dict__ by
+    # declaring __slots__ themselves; subclasses that do not declare any still
+    # get a __dict__ as usual
+    __slots__ = ()
+
     def __init__(self):
         self.loc = {}
 
@@ -11,6 +11,10 @@ class XY(VirtualObj):
     Keeps all coordinates on the grid
     """
 
+    # XY objects are created for every rect corner and route point, so they skip
+    # the per-instance __dict__; attribute access and memory footprint both win
+    __slots__ = ('_res', '_x', '_y', 'loc')
+
     def __init__(self,
                  xy,
                  res=.001  # type: float